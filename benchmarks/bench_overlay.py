@@ -0,0 +1,92 @@
+""" Compare the integer alpha compositing with the old float64 blend on a print-size canvas.
+
+    Run from the root of the repository :
+        python3 ./benchmarks/bench_overlay.py
+"""
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from design.compositing import overlay_image_alpha
+
+
+def float_overlay_image_alpha(img, img_overlay, x, y, alpha_mask):
+    """ Old float64 blend of DesignHandler, kept as the reference of the benchmark. """
+    y1, y2 = max(0, y), min(img.shape[0], y + img_overlay.shape[0])
+    x1, x2 = max(0, x), min(img.shape[1], x + img_overlay.shape[1])
+    y1o, y2o = max(0, -y), min(img_overlay.shape[0], img.shape[0] - y)
+    x1o, x2o = max(0, -x), min(img_overlay.shape[1], img.shape[1] - x)
+
+    img_crop = img[y1:y2, x1:x2]
+    img_overlay_crop = img_overlay[y1o:y2o, x1o:x2o]
+    alpha = alpha_mask[y1o:y2o, x1o:x2o, np.newaxis]
+    alpha_inv = 1.0 - alpha
+
+    img_crop[:] = alpha * img_overlay_crop + alpha_inv * img_crop
+    return img
+
+
+def create_images(canvas_size:tuple, icon_size:tuple):
+    """ Create a transparent canvas with some opaque text rows and a random anti-aliased icon.
+
+        Attributes :
+            canvas_size -> tuple : width and height of the canvas.
+            icon_size -> tuple : width and height of the icon.
+    """
+    random = np.random.default_rng(0)
+
+    canvas = np.full((canvas_size[1], canvas_size[0], 4), (255, 255, 255, 0), dtype=np.uint8)
+    canvas[:canvas_size[1] // 5, :, :] = (255, 255, 255, 255)
+
+    icon = random.integers(0, 256, (icon_size[1], icon_size[0], 4), dtype=np.uint8)
+    return canvas, icon
+
+
+def measure(function, repeat:int):
+    """ Return the best time and the peak of allocated memory of a function.
+
+        Attributes :
+            function -> function : function to measure, without argument.
+            repeat -> int : number of runs, the best time is kept.
+    """
+    best_time = None
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        function()
+        duration = time.perf_counter() - start_time
+        best_time = duration if best_time == None else min(best_time, duration)
+
+    tracemalloc.start()
+    function()
+    peak_memory = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return best_time, peak_memory
+
+
+def main(repeat:int = 3):
+    for canvas_size, icon_size in [((4500, 5400), (3000, 4000)), ((2250, 2700), (1500, 2000))]:
+        canvas, icon = create_images(canvas_size, icon_size)
+        x, y = (canvas_size[0] - icon_size[0]) // 2, canvas_size[1] // 5
+
+        def run_float():
+            float_overlay_image_alpha(canvas.copy(), icon, x, y, icon[:, :, 3] / 255.0)
+
+        def run_integer():
+            overlay_image_alpha(canvas.copy(), icon, x, y)
+
+        # The canvas copy is in both runs, it is measured alone to be removed.
+        copy_time, copy_memory = measure(canvas.copy, repeat)
+        print(f"Canvas {canvas_size[0]}x{canvas_size[1]}, icon {icon_size[0]}x{icon_size[1]} :")
+        for name, function in [("float64", run_float), ("uint8 fixed-point", run_integer)]:
+            duration, peak_memory = measure(function, repeat)
+            print(f"    {name:<18} {(duration - copy_time) * 1000:8.1f} ms   peak {(peak_memory - copy_memory) / 2 ** 20:8.1f} MiB")
+
+
+if __name__ == '__main__':
+    main()
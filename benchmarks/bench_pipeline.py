@@ -0,0 +1,357 @@
+""" Time every stage of the design pipeline on synthetic inputs, save the results as JSON and compare them with a baseline.
+
+    Run from the root of the repository :
+        python3 ./benchmarks/bench_pipeline.py
+        python3 ./benchmarks/bench_pipeline.py --save-baseline
+        python3 ./benchmarks/bench_pipeline.py --baseline ./benchmarks/results/baseline.json --threshold 0.2
+
+    The stages run in a temporary working folder (with links to the fonts and the SVGs), so the images,
+    the caches and the output database of the repository are never touched.
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT_FOLDER = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+sys.path.insert(0, os.path.join(ROOT_FOLDER, "src"))
+
+import numpy as np
+
+from design.canvas import BlankCanvas
+from design.compositing import overlay_image_alpha
+from design.design_handler import DesignHandler
+from design.image_writer import IMAGE_WRITER
+from design.place_finder import PlaceFinder
+from design.svg_editor import SVGEditor
+from inout.json_parser import JSONInputParser
+from text.text_creator import TextCreator
+
+RESULTS_FOLDER = os.path.join(ROOT_FOLDER, "benchmarks", "results")
+
+# Synthetic quotes, from one short line to many long ones, with their keywords.
+QUOTES = {
+    "short": (["I'm a big fan"], ["fan"]),
+    "medium": (["I have a joke on programming", "but it only works on my", "computer"], ["programming", "computer"]),
+    "long": ([
+        "There are 10 types of programmers :",
+        " - Those who understand binary.",
+        " - Those who don't.",
+        "And those who did not expect",
+        "this joke to be in ternary"
+    ], ["binary", "programmers", "ternary"]),
+}
+
+CANVAS_SIZES = [(4500, 5400), (2250, 2700)]
+
+
+def main():
+    args = parse_arguments()
+
+    work_folder = create_work_folder()
+    current_folder = os.getcwd()
+    os.chdir(work_folder)
+    try:
+        results = run_benchmarks(args.repeat, args.only)
+    finally:
+        os.chdir(current_folder)
+        shutil.rmtree(work_folder, ignore_errors=True)
+
+    report = {"meta": get_meta(args.repeat), "results": results}
+
+    output_path = args.output or os.path.join(RESULTS_FOLDER, datetime.datetime.now().strftime("%Y%m%d-%H%M%S") + ".json")
+    save_json(output_path, report)
+    if args.save_baseline:
+        save_json(args.baseline, report)
+    print(f"\nResults saved in {output_path}")
+
+    if not args.save_baseline and os.path.isfile(args.baseline):
+        with open(args.baseline) as json_file:
+            baseline = json.load(json_file)
+        regressions = compare(results, baseline["results"], args.threshold)
+        if regressions:
+            sys.exit(1)
+
+
+def parse_arguments():
+    """ Parse the command line arguments. """
+    parser = argparse.ArgumentParser(description="Benchmark every stage of the design pipeline.")
+    parser.add_argument("--repeat", type=int, default=5, help="number of timed runs of each case, after one warm-up run.")
+    parser.add_argument("--only", default=None, help="run only the cases whose name starts with this text (ex: 'text/').")
+    parser.add_argument("--output", default=None, help="path of the JSON results, a timestamped file in benchmarks/results by default.")
+    parser.add_argument("--baseline", default=os.path.join(RESULTS_FOLDER, "baseline.json"), help="path of the baseline results.")
+    parser.add_argument("--save-baseline", action="store_true", help="save the results as the new baseline.")
+    parser.add_argument("--threshold", type=float, default=0.2, help="relative slowdown of the median flagged as a regression.")
+    return parser.parse_args()
+
+
+def create_work_folder():
+    """ Create a temporary working folder laid out like the repository, with a synthetic input JSON. """
+    work_folder = tempfile.mkdtemp(prefix="design-bench-")
+
+    os.symlink(os.path.join(ROOT_FOLDER, "fonts"), os.path.join(work_folder, "fonts"))
+    os.makedirs(os.path.join(work_folder, "images", "waiting"))
+    os.makedirs(os.path.join(work_folder, "images", "output"))
+    os.makedirs(os.path.join(work_folder, "data"))
+    os.symlink(os.path.join(ROOT_FOLDER, "images", "svg"), os.path.join(work_folder, "images", "svg"))
+
+    # One design per quote and SVG.
+    input_data = []
+    for (words, keywords) in QUOTES.values():
+        for design in get_designs():
+            input_data.append({"index": len(input_data) + 1, "text": words, "keywords": keywords, "design": design})
+    save_json(os.path.join(work_folder, "data", "input.json"), input_data)
+
+    return work_folder
+
+
+def get_designs():
+    """ Get the name of every bundled SVG. """
+    svg_folder = os.path.join(ROOT_FOLDER, "images", "svg")
+    return sorted(filename[:-4] for filename in os.listdir(svg_folder) if filename.endswith(".svg"))
+
+
+def get_fonts():
+    """ Get the name of every bundled font. """
+    font_folder = os.path.join(ROOT_FOLDER, "fonts")
+    return sorted(name for name in os.listdir(font_folder) if os.path.isdir(os.path.join(font_folder, name)))
+
+
+def run_benchmarks(repeat:int, only:str = None):
+    """ Run every case and return their timings, by case name.
+
+        Attributes :
+            repeat -> int : number of timed runs of each case.
+            only -> str : prefix of the names of the cases to run, every case by default.
+    """
+    results = {}
+    for name, function in list_cases():
+        if only != None and not name.startswith(only):
+            continue
+
+        try:
+            results[name] = measure(function, repeat)
+            print(f"{name:<60} median {results[name]['median'] * 1000:9.1f} ms   min {results[name]['min'] * 1000:9.1f} ms")
+        except Exception as error:
+            results[name] = {"error": f"{type(error).__name__}: {str(error).splitlines()[0] if str(error) else ''}"}
+            print(f"{name:<60} [FAILED] {results[name]['error']}")
+
+    return results
+
+
+def measure(function, repeat:int):
+    """ Run a function once to warm it up, then time it and return the statistics of the runs.
+
+        Attributes :
+            function -> function : function to measure, without argument.
+            repeat -> int : number of timed runs.
+    """
+    function()
+
+    durations = []
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        function()
+        durations.append(time.perf_counter() - start_time)
+
+    return {
+        "median": statistics.median(durations),
+        "min": min(durations),
+        "max": max(durations),
+        "runs": repeat
+    }
+
+
+def list_cases():
+    """ List every benchmark case as 2-tuple (name, function without argument). """
+    cases = []
+    fonts = get_fonts()
+    designs = get_designs()
+
+    # Start of a new interpreter, alone and importing the entry points and the pipeline.
+    for module in [None, "main", "batch", "design.design_handler"]:
+        cases.append((f"startup/{module or 'python'}", make_startup_case(module)))
+
+    # Text layout and drawing, for each quote, font and canvas size.
+    for canvas_size in CANVAS_SIZES:
+        canvas = BlankCanvas(size=canvas_size)
+        for quote_name, (words, keywords) in QUOTES.items():
+            for font in fonts:
+                name = f"text/write_text/{quote_name}/{font}/{canvas_size[0]}x{canvas_size[1]}"
+                cases.append((name, make_write_text_case(canvas, words, keywords, font)))
+
+    # Image placement, for each quote and algorithm.
+    canvas = BlankCanvas(size=CANVAS_SIZES[0])
+    for quote_name, (words, keywords) in QUOTES.items():
+        text_positions = get_text_positions(canvas, words, keywords, fonts[0])
+        for method in PlaceFinder.METHODS:
+            name = f"place/find_best_place/{quote_name}/{method}"
+            cases.append((name, make_place_case(text_positions, canvas.size, method)))
+
+    # Rasterization and color analysis of each icon, without any cache.
+    for design in designs:
+        cases.append((f"svg/to_array/{design}", make_rasterize_case(design)))
+        cases.append((f"svg/get_best_key_color/{design}", make_key_color_case(design)))
+
+    # Compositing of an icon on the canvas.
+    for canvas_size in CANVAS_SIZES:
+        name = f"compositing/overlay_image_alpha/{canvas_size[0]}x{canvas_size[1]}"
+        cases.append((name, make_overlay_case(canvas_size)))
+
+    # Whole templates, with the caches of a long run.
+    input_parser = JSONInputParser("./data/input.json")
+    for index in input_parser.get_indexes():
+        data = input_parser.get_data(index)
+        quote_name = next(name for name, (words, _) in QUOTES.items() if words == data["text"])
+        name = f"build/{quote_name}/{data['design']}"
+        cases.append((name, make_build_case(index, input_parser)))
+
+    return cases
+
+
+def get_output_data(words:list, font:str):
+    """ Get the output data that fixes the random choices of a TextCreator.
+
+        Attributes :
+            words -> list : lines of the quote.
+            font -> str : font of the text.
+    """
+    return {"font": font, "list_fonts_index": [i % 2 for i in range(len(words))], "type_writing": True}
+
+
+def get_text_positions(canvas:object, words:list, keywords:list, font:str):
+    """ Get the text boxes of a quote, used to place the image.
+
+        Attributes :
+            canvas -> object : BlankCanvas of the design.
+            words -> list : lines of the quote.
+            keywords -> list : keywords of the quote.
+            font -> str : font of the text.
+    """
+    text_creator = TextCreator(words, keywords, canvas.new_canvas(), "white", (0, 0, 255), get_output_data(words, font))
+    text_creator.layout_text(True)
+    return text_creator.text_positions
+
+
+def make_startup_case(module:str):
+    command = [sys.executable, "-c", "pass" if module == None else f"import {module}"]
+    environment = dict(os.environ, PYTHONPATH=os.path.join(ROOT_FOLDER, "src"))
+
+    def run():
+        subprocess.run(command, env=environment, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return run
+
+
+def make_write_text_case(canvas:object, words:list, keywords:list, font:str):
+    def run():
+        text_creator = TextCreator(words, keywords, canvas.new_canvas(), "white", (0, 0, 255), get_output_data(words, font))
+        text_creator.write_text(True)
+    return run
+
+
+def make_place_case(text_positions:list, design_size:tuple, method:str):
+    def run():
+        PlaceFinder(text_positions, design_size, (600, 800), True, method=method).find_best_place()
+    return run
+
+
+def make_rasterize_case(design:str):
+    def run():
+        editor = SVGEditor(design)
+        editor.draw_border("#FFFFFF")
+        editor.resize(3000, 3000)
+        editor.to_array(use_cache=False)
+    return run
+
+
+def make_key_color_case(design:str):
+    def run():
+        SVGEditor.KEY_COLORS.clear()
+        SVGEditor(design).get_best_key_color()
+    return run
+
+
+def make_overlay_case(canvas_size:tuple):
+    canvas = BlankCanvas(size=canvas_size)
+    icon_size = canvas_size[0] * 2 // 3, canvas_size[1] * 2 // 3
+    icon = np.random.default_rng(0).integers(0, 256, (icon_size[1], icon_size[0], 4), dtype=np.uint8)
+    x, y = (canvas_size[0] - icon_size[0]) // 2, canvas_size[1] // 5
+
+    def run():
+        overlay_image_alpha(canvas.new_canvas(), icon, x, y)
+    return run
+
+
+def make_build_case(index:int, input_parser:object):
+    def run():
+        random.seed(index)
+        DesignHandler(index, input_parser=input_parser).build()
+        IMAGE_WRITER.flush()
+    return run
+
+
+def get_meta(repeat:int):
+    """ Get the description of the machine and the run, to know if two results can be compared.
+
+        Attributes :
+            repeat -> int : number of timed runs of each case.
+    """
+    return {
+        "date": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "processor": platform.processor(),
+        "cpu_count": os.cpu_count(),
+        "numpy": np.__version__,
+        "repeat": repeat
+    }
+
+
+def compare(results:dict, baseline:dict, threshold:float):
+    """ Print the cases slower than the baseline and return their names.
+
+        Attributes :
+            results -> dict : timings of the run, by case name.
+            baseline -> dict : timings of the baseline, by case name.
+            threshold -> float : relative slowdown of the median flagged as a regression.
+    """
+    regressions = []
+    print(f"\nComparison with the baseline (regression above +{threshold * 100:.0f}%) :")
+
+    for name, result in results.items():
+        reference = baseline.get(name)
+        if reference == None or "median" not in reference or "median" not in result:
+            continue
+
+        change = result["median"] / reference["median"] - 1
+        is_regression = change > threshold
+        if is_regression:
+            regressions.append(name)
+        print(f"    {'[REGRESSION]' if is_regression else '[OK]':<13} {name:<60} {change * 100:+7.1f}%")
+
+    print(f"{len(regressions)} regression(s).")
+    return regressions
+
+
+def save_json(path:str, data:object):
+    """ Save some data as an indented JSON file, creating its folder.
+
+        Attributes :
+            path -> str : path of the JSON file.
+            data -> object : data to save.
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w") as json_file:
+        json_file.write(json.dumps(data, indent=4))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,298 @@
+from inout.build_manifest import BuildManifest
+from inout.json_parser import get_input_parser
+from inout.output_store import get_output_store
+
+from design.image_writer import ImageWriter, get_output_path, parse_compression
+from tracer import configure_tracer, summarize_trace
+
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import argparse
+import json
+import os
+import random
+import time
+
+import printer as pr
+
+# The design pipeline is only imported by the workers (see run_job), the main process only reads the input and the results.
+
+# Input JSON loaded once by each worker process.
+INPUT_PARSER = None
+
+
+def main():
+    """ Build every asked design of the input JSON without any question. """
+    args = parse_arguments()
+
+    input_parser = get_input_parser(args.input)
+    indexes = parse_indexes(args.indexes, input_parser.get_indexes())
+    jobs = list_jobs(indexes, args.mode, args.templates, args.colors.split(","))
+
+    # Only build again the saved designs whose inputs changed.
+    manifest, output_hashes, skipped_outputs = None, {}, 0
+    if args.mode == "recreate":
+        manifest = BuildManifest(args.manifest)
+        jobs, output_hashes, skipped_outputs = filter_unchanged_jobs(jobs, input_parser, manifest, args.force, args.format)
+
+    # The workers inherit the tracing of the batch.
+    if args.trace != None or args.profile != None:
+        configure_tracer(args.trace, args.trace_format, args.profile)
+
+    print("\n-------- " + pr.bold_print(f"STARTING BATCH ({len(jobs)} jobs, {len(indexes)} designs, {skipped_outputs} unchanged images)") + " --------")
+    summary = run_jobs(jobs, input_parser, args.workers, args.preview_scale, args.format, args.waiting_compression, args.output_compression)
+    summary["mode"] = args.mode
+    summary["skipped_outputs"] = skipped_outputs
+
+    if manifest != None:
+        for design in summary["designs"]:
+            for result in design["jobs"]:
+                if result["error"] == None:
+                    for output_path in result["outputs"]:
+                        manifest.record(output_path, output_hashes[output_path])
+        manifest.save()
+    if args.trace != None and os.path.isfile(args.trace):
+        summary["trace"] = summarize_trace(args.trace)
+
+    for name, stats in summary["caches"].items():
+        print(f"- {name} : {stats['hits']} hits, {stats['misses']} misses ({round(stats['hit_rate'] * 100, 1)}% hit rate)")
+
+    with open(args.summary, "w") as json_file:
+        json_file.write(json.dumps(summary, indent=4))
+
+    print(f"\n----- {pr.green_print('[BATCH FINISHED]')} {pr.bold_print(str(round(summary['seconds'], 1)) + 's')} -----")
+
+
+def parse_arguments():
+    """ Parse the command line arguments. """
+    parser = argparse.ArgumentParser(description="Generate the designs of the input JSON in one run.")
+    parser.add_argument("--indexes", default="all", help="'all' or design indexes and ranges, ex: '1-3,7'.")
+    parser.add_argument("--mode", choices=["create", "recreate"], default="recreate",
+                        help="'create' makes templates in images/waiting, 'recreate' makes the saved designs in images/output.")
+    parser.add_argument("--templates", type=int, default=1, help="number of templates per design in 'create' mode.")
+    parser.add_argument("--preview-scale", type=float, default=1, help="scale of the templates in 'create' mode (ex: 0.25 for quick previews).")
+    parser.add_argument("--colors", default="white,black", help="colors of the designs in 'recreate' mode, separated by commas.")
+    parser.add_argument("--format", choices=ImageWriter.FORMATS, default="png", help="format of the images ('webp' images are lossless).")
+    parser.add_argument("--waiting-compression", type=parse_compression, default="fast",
+                        help="PNG compression of the templates : 'fast', 'best' or a level from 0 to 9.")
+    parser.add_argument("--output-compression", type=parse_compression, default="best",
+                        help="PNG compression of the saved designs : 'fast', 'best' or a level from 0 to 9.")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="number of worker processes.")
+    parser.add_argument("--summary", default="./data/batch-summary.json", help="path of the JSON summary of the run.")
+    parser.add_argument("--input", default="./data/input.json", help="path of the input catalog, '.json' or '.jsonl' (one design per line).")
+    parser.add_argument("--manifest", default="./data/build-manifest.json", help="hashes of the inputs of each output image, to skip the unchanged ones in 'recreate' mode.")
+    parser.add_argument("--force", action="store_true", help="build every output image again, even the unchanged ones (the manifest is still updated).")
+    parser.add_argument("--trace", default=None, help="file where the duration of each stage of each template is written, its percentiles are added to the summary.")
+    parser.add_argument("--trace-format", choices=["jsonl", "chrome"], default="jsonl", help="'jsonl' (one line per template) or 'chrome' (chrome://tracing or Perfetto).")
+    parser.add_argument("--profile", default=None, help="folder where a cProfile capture of each template is saved.")
+    return parser.parse_args()
+
+
+def parse_indexes(text:str, existing_indexes:list):
+    """ Get the list of design indexes from a text like 'all' or '1-3,7'.
+
+        Attributes :
+            text -> str : indexes and ranges separated by commas, or 'all'.
+            existing_indexes -> list : indexes of the input JSON.
+    """
+    if text.lower() == "all":
+        return list(existing_indexes)
+
+    indexes = []
+    for part in text.split(","):
+        if "-" in part:
+            first, last = part.split("-")
+            indexes += range(int(first), int(last) + 1)
+        else:
+            indexes.append(int(part))
+
+    existing_indexes = set(existing_indexes)
+    missing_indexes = [index for index in indexes if index not in existing_indexes]
+    if missing_indexes:
+        raise Exception(f"There is no data for the indexes {missing_indexes}.")
+
+    return indexes
+
+
+def list_jobs(indexes:list, mode:str, number_of_templates:int, colors:tuple = ("white", "black")):
+    """ List the jobs as 3-tuple (index, template number, colors), the colors are None for a template.
+        A saved design is one job for all its colors, so its layout is only done once.
+
+        Attributes :
+            indexes -> list : design indexes to build.
+            mode -> str : 'create' or 'recreate'.
+            number_of_templates -> int : number of templates per design in 'create' mode.
+            colors -> tuple : colors of the designs in 'recreate' mode.
+    """
+    if mode == "create":
+        return [(index, template_number, None) for index in indexes for template_number in range(number_of_templates)]
+    return [(index, 1, colors) for index in indexes]
+
+
+def filter_unchanged_jobs(jobs:list, input_parser:object, manifest:object, force:bool = False, image_format:str = "png"):
+    """ Remove the colors whose output image is up to date from the 'recreate' jobs, and the jobs with no color left.
+        Return a 3-tuple with the jobs to run, the hash of the inputs of each output image to build and the number of skipped images.
+
+        Attributes :
+            jobs -> list : list of 3-tuple (index, template number, colors).
+            input_parser -> object : loaded JSONInputParser.
+            manifest -> object : BuildManifest of the previous builds.
+            force -> bool : keep every job, only the hashes are computed.
+            image_format -> str : format of the output images.
+    """
+    saved_designs = {value['index']: value for value in get_output_store().get_all()}
+
+    jobs_to_run, output_hashes, skipped_outputs = [], {}, 0
+    for index, template_number, colors in jobs:
+        # A design never saved fails in its job, as before.
+        if index not in saved_designs:
+            jobs_to_run.append((index, template_number, colors))
+            continue
+
+        input_data = input_parser.get_data(index)
+        colors_to_build = []
+        for color in colors:
+            output_path = get_output_path(input_data['design'], template_number, color, image_format)
+            output_hash = manifest.get_hash(input_data, saved_designs[index], color)
+
+            if not force and manifest.is_up_to_date(output_path, output_hash):
+                skipped_outputs += 1
+            else:
+                colors_to_build.append(color)
+                output_hashes[output_path] = output_hash
+
+        if colors_to_build:
+            jobs_to_run.append((index, template_number, colors_to_build))
+
+    return jobs_to_run, output_hashes, skipped_outputs
+
+
+def run_jobs(jobs:list, input_parser:object, number_of_workers:int, preview_scale:float = 1, image_format:str = "png",
+             waiting_compression = "fast", output_compression = "best"):
+    """ Run the jobs in worker processes and return the summary of the run.
+
+        Attributes :
+            jobs -> list : list of 3-tuple (index, template number, colors).
+            input_parser -> object : loaded JSONInputParser, sent once to each worker.
+            number_of_workers -> int : number of worker processes.
+            preview_scale -> float : scale of the templates.
+            image_format -> str : format of the images.
+            waiting_compression -> str/int : compression of the templates.
+            output_compression -> str/int : compression of the saved designs.
+    """
+    os.makedirs("./images/waiting/", exist_ok=True)
+    os.makedirs("./images/output/", exist_ok=True)
+
+    designs = {}
+    caches = {}
+    start_time = time.time()
+
+    with ProcessPoolExecutor(max_workers=number_of_workers, initializer=init_worker, initargs=(input_parser,)) as executor:
+        futures = [executor.submit(run_job, *job, preview_scale, image_format, waiting_compression, output_compression) for job in jobs]
+
+        for finished, future in enumerate(as_completed(futures)):
+            result = future.result()
+
+            design = designs.setdefault(result["index"], {"index": result["index"], "seconds": 0.0, "jobs": [], "errors": 0})
+            design["seconds"] += result["seconds"]
+            design["jobs"].append(result)
+            if result["error"] != None:
+                design["errors"] += 1
+
+            for name, counters in result["caches"].items():
+                cache = caches.setdefault(name, {"hits": 0, "misses": 0})
+                cache["hits"] += counters["hits"]
+                cache["misses"] += counters["misses"]
+
+            status = pr.green_print("[FINISHED]") if result["error"] == None else pr.bold_print("[FAILED] " + result["error"])
+            load_process = int((finished + 1) / len(jobs) * 100)
+            print(f"+ Design {result['index']} / {result['template_number']} / {result['colors']} : {status} {load_process}%")
+
+    return {
+        "seconds": time.time() - start_time,
+        "workers": number_of_workers,
+        "jobs": len(jobs),
+        "errors": sum(design["errors"] for design in designs.values()),
+        "caches": {name: get_hit_rate(cache) for name, cache in caches.items()},
+        "designs": sorted(designs.values(), key=lambda design: design["index"])
+    }
+
+
+def get_hit_rate(counters:dict):
+    """ Add the hit rate to the hits and misses of a cache.
+
+        Attributes :
+            counters -> dict : 'hits' and 'misses' of the cache.
+    """
+    requests = counters["hits"] + counters["misses"]
+    return {**counters, "hit_rate": counters["hits"] / requests if requests else 0.0}
+
+
+def get_cache_stats():
+    """ Get the usage counters of the caches of the worker process. """
+    from design.raster_cache import RASTER_CACHE
+    from text.font_cache import FONT_CACHE
+    return {"font_cache": FONT_CACHE.get_stats(), "raster_cache": RASTER_CACHE.get_stats()}
+
+
+def init_worker(input_parser:object):
+    """ Keep the input JSON of the run in the worker process.
+
+        Attributes :
+            input_parser -> object : loaded JSONInputParser.
+    """
+    global INPUT_PARSER
+    INPUT_PARSER = input_parser
+
+
+def run_job(index:int, template_number:int, colors:list, preview_scale:float = 1, image_format:str = "png",
+            waiting_compression = "fast", output_compression = "best"):
+    """ Build one template (colors is None) or every color of a saved design, in a worker process.
+
+        Attributes :
+            index -> int : index of the design.
+            template_number -> int : number of the template.
+            colors -> list : colors of the design to recreate, None to create a template.
+            preview_scale -> float : scale of the template (saved designs are always at full size).
+            image_format -> str : format of the images.
+            waiting_compression -> str/int : compression of the template.
+            output_compression -> str/int : compression of the saved design.
+    """
+    # Forked processes share the random state of the parent, so give each job its own.
+    random.seed()
+
+    from design.design_handler import DesignHandler
+    from design.image_writer import IMAGE_WRITER
+
+    result = {"index": index, "template_number": template_number, "colors": colors, "outputs": [], "error": None}
+    cache_stats = get_cache_stats()
+    start_time = time.time()
+
+    image_options = {"image_format": image_format, "waiting_compression": waiting_compression, "output_compression": output_compression}
+    try:
+        if colors == None:
+            DesignHandler(index, template_number=template_number, input_parser=INPUT_PARSER, preview_scale=preview_scale, **image_options).build()
+        else:
+            result["outputs"] = DesignHandler(index, template_number=template_number, is_recreating=True, input_parser=INPUT_PARSER, **image_options).build_colorways(colors)
+    except Exception as error:
+        result["error"] = str(error)
+    finally:
+        # The job is only done once its images are written, even when it failed after handing some over,
+        # so its writes and their errors never go to the next job of the worker.
+        try:
+            IMAGE_WRITER.flush()
+        except Exception as error:
+            if result["error"] == None:
+                result["error"] = str(error)
+
+    result["seconds"] = time.time() - start_time
+
+    # Only the use of the caches by this job, the workers run many jobs.
+    result["caches"] = {
+        name: {"hits": stats["hits"] - cache_stats[name]["hits"], "misses": stats["misses"] - cache_stats[name]["misses"]}
+        for name, stats in get_cache_stats().items()
+    }
+    return result
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+import sys
+
+import cv2
+import numpy as np
+
+class BlankCanvas:
+    """ Used to keep the blank design of the process, each template gets its own fresh copy. """
+
+    def __init__(self, image_path:str = None, size:tuple = None, background:tuple = (255, 255, 255, 0), scale:float = 1):
+        """ Attributes :
+                image_path -> str : blank PNG image, decoded only once (not used when a size is given).
+                size -> tuple : 2-tuple width and height of a solid canvas, to not decode any image.
+                background -> tuple : BGRA color of the solid canvas.
+                scale -> float : factor applied to the size of the canvas (ex: 0.25 for a preview).
+        """
+        self.__image = None
+
+        if size != None:
+            self.size = self.__scale_size(size, scale)
+            self.background = tuple(background)
+            return
+
+        image = cv2.imread(image_path, cv2.IMREAD_UNCHANGED)
+        if image is None:
+            raise Exception(f"The blank image '{image_path}' can't be read.")
+        if image.shape[2] == 3:
+            image = cv2.cvtColor(image, cv2.COLOR_BGR2BGRA)
+        if scale != 1:
+            image = cv2.resize(image, self.__scale_size((image.shape[1], image.shape[0]), scale), interpolation=cv2.INTER_AREA)
+        self.size = image.shape[1], image.shape[0]
+
+        # A solid image is only kept as its color, the copies are filled instead of copied.
+        first_pixel = image[0, 0]
+        if (image == first_pixel).all():
+            self.background = tuple(int(value) for value in first_pixel)
+        else:
+            image.flags.writeable = False
+            self.__image = image
+            self.background = None
+
+
+    def __scale_size(self, size:tuple, scale:float):
+        """ Get a size multiplied by a factor, at least one pixel wide and high.
+
+            Attributes :
+                size -> tuple : 2-tuple width and height.
+                scale -> float : factor applied to the size.
+        """
+        return tuple(max(1, round(value * scale)) for value in size)
+
+
+    def new_canvas(self):
+        """ Get a new writable canvas for a template. """
+        if self.__image is not None:
+            return self.__image.copy()
+
+        # Fill the 4 channels of each pixel at once as a 32 bits value.
+        canvas = np.empty((self.size[1], self.size[0]), dtype=np.uint32)
+        canvas.fill(int.from_bytes(bytes(self.background), sys.byteorder))
+        return canvas.view(np.uint8).reshape(self.size[1], self.size[0], 4)
+
+
+# Blank canvases of the process, by image or by size and color.
+BLANK_CANVASES = {}
+
+def get_blank_canvas(image_path:str = "./images/svg/blank.png", size:tuple = None, background:tuple = (255, 255, 255, 0), scale:float = 1):
+    """ Get the blank canvas of the process, loaded only once.
+
+        Attributes :
+            image_path -> str : blank PNG image (not used when a size is given).
+            size -> tuple : 2-tuple width and height of a solid canvas.
+            background -> tuple : BGRA color of the solid canvas.
+            scale -> float : factor applied to the size of the canvas.
+    """
+    key = (image_path if size == None else (tuple(size), tuple(background))), scale
+
+    if key not in BLANK_CANVASES:
+        BLANK_CANVASES[key] = BlankCanvas(image_path, size, background, scale)
+    return BLANK_CANVASES[key]
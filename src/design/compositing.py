@@ -0,0 +1,87 @@
+import numpy as np
+
+def overlay_image_alpha(img:object, img_overlay:object, x:int, y:int):
+    """ Overlay "img_overlay" onto "img" at (x, y), in place, with the "over" operator of their alpha channels.
+        The blend stays in integer math, with a few one-channel 32 bits buffers of the overlapped region.
+
+        Attributes :
+            img -> object : BGRA uint8 image to draw on.
+            img_overlay -> object : BGRA uint8 image to draw.
+            x -> int : x position of the overlay in the image.
+            y -> int : y position of the overlay in the image.
+    """
+    # Image ranges
+    y1, y2 = max(0, y), min(img.shape[0], y + img_overlay.shape[0])
+    x1, x2 = max(0, x), min(img.shape[1], x + img_overlay.shape[1])
+
+    # Overlay ranges
+    y1o, y2o = max(0, -y), min(img_overlay.shape[0], img.shape[0] - y)
+    x1o, x2o = max(0, -x), min(img_overlay.shape[1], img.shape[1] - x)
+
+    # Exit if nothing to do
+    if y1 >= y2 or x1 >= x2 or y1o >= y2o or x1o >= x2o:
+        return img
+
+    img_crop = img[y1:y2, x1:x2]
+    img_overlay_crop = img_overlay[y1o:y2o, x1o:x2o]
+
+    # Weights of each image, scaled by 255 * 255 : the result alpha is their sum.
+    overlay_weight = img_overlay_crop[:, :, 3].astype(np.int32)
+    image_weight = (255 - overlay_weight) * img_crop[:, :, 3]
+    overlay_weight *= 255
+    total_weight = overlay_weight + image_weight
+
+    # Share of the overlay in the result color, in fixed point (1/4096), with a single division.
+    # It is 0 where both images are transparent, so those pixels are left as they are.
+    overlay_share = overlay_weight
+    overlay_share <<= 12
+    overlay_share += total_weight >> 1
+    overlay_share //= np.maximum(total_weight, 1)
+
+    for channel in range(3):
+        color = img_overlay_crop[:, :, channel].astype(np.int32)
+        color -= img_crop[:, :, channel]
+        color *= overlay_share
+        color += 2048
+        color >>= 12
+        color += img_crop[:, :, channel]
+        np.copyto(img_crop[:, :, channel], color, casting="unsafe")
+
+    total_weight += 127
+    total_weight //= 255
+    np.copyto(img_crop[:, :, 3], total_weight, casting="unsafe")
+
+    return img
+
+
+def blend_color(img:object, color:tuple, mask:object):
+    """ Paint a color onto "img", in place, with "mask" as coverage, exactly like PIL drawing an ink through a mask.
+        Only the rows and columns covered by the mask are computed.
+
+        Attributes :
+            img -> object : BGRA uint8 image to paint on.
+            color -> tuple : BGRA color to paint.
+            mask -> object : uint8 coverage of the color, of the size of the image.
+    """
+    rows, columns = np.flatnonzero(mask.any(axis=1)), np.flatnonzero(mask.any(axis=0))
+    if len(rows) == 0:
+        return img
+
+    img_crop = img[rows[0]:rows[-1] + 1, columns[0]:columns[-1] + 1]
+    mask_crop = mask[rows[0]:rows[-1] + 1, columns[0]:columns[-1] + 1].astype(np.int32)
+
+    # Like PIL on RGBA images, the color replaces the pixel where the image is fully transparent, only the alpha is blended there.
+    # Everywhere else (semi-transparent pixels too) the color is blended with the mask.
+    is_blended = (img_crop[:, :, 3] != 0) | (mask_crop == 0)
+    color_mask = np.where(is_blended, mask_crop, 255)
+
+    # Same rounded division by 255 as PIL, the alpha channel is done last.
+    for channel, channel_mask in [(0, color_mask), (1, color_mask), (2, color_mask), (3, mask_crop)]:
+        value = img_crop[:, :, channel] * (255 - channel_mask)
+        value += channel_mask * color[channel]
+        value += 128
+        value += value >> 8
+        value >>= 8
+        np.copyto(img_crop[:, :, channel], value, casting="unsafe")
+
+    return img
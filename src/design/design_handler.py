@@ -1,56 +1,287 @@
-from inout.json_parser import JSONInputParser, JSONOutputParser
+from inout.json_parser import JSONOutputParser, get_input_parser
+from inout.template_result import TemplateResult
 
+from design.canvas import get_blank_canvas
+from design.compositing import blend_color, overlay_image_alpha
+from design.image_writer import IMAGE_WRITER, ImageWriter, get_output_path
 from design.place_finder import PlaceFinder
 from design.svg_editor import SVGEditor
+from design.raster_cache import RASTER_CACHE
+from text.font_cache import FONT_CACHE
 from text.text_creator import TextCreator
 
-from PIL import Image
-import cv2
-import numpy as np
+from tracer import TRACER
 
+from PIL import ImageColor
+
+import hashlib
+import json
+import os
 import random
 
 class DesignHandler:
     """ Used to generate many designs. """
+
+    # Version of the saved layout plans, a plan of another version is computed again.
+    LAYOUT_PLAN_VERSION = 1
     
-    def __init__(self, index:int, template_number:int = 1, is_recreating:bool = False, color:str = "white"):
+    def __init__(self, index:int, template_number:int = 1, is_recreating:bool = False, color:str = "white", place_method:str = "grid", input_parser:object = None,
+                 canvas_size:tuple = None, background:tuple = (255, 255, 255, 0), preview_scale:float = 1, image_format:str = "png",
+                 waiting_compression = "fast", output_compression = "best"):
         """ Attributes :
                 index -> int : index of the data in the JSON file.
                 template_number -> int : number of the template to create.
                 is_recreating -> bool : do we want to recreate the design.
                 color -> str : color of the design.
+                place_method -> str : algorithm used to place the image (see PlaceFinder.METHODS).
+                input_parser -> object : JSONInputParser to use, the one shared by the process by default.
+                canvas_size -> tuple : 2-tuple width and height of a solid canvas, the blank image is used by default.
+                background -> tuple : BGRA color of the solid canvas.
+                preview_scale -> float : scale of a preview template (ex: 0.25), the canvas, the fonts, the placement and the icon are smaller.
+                                         Only the random choices are saved, so the kept template is re-created the same at full size.
+                image_format -> str : format of the written images (see ImageWriter.FORMATS).
+                waiting_compression -> str/int : compression of the templates, 'fast', 'best' or a PNG compression level from 0 to 9.
+                output_compression -> str/int : compression of the re-created designs.
         """
-        self.DATA = JSONInputParser().get_data(index)
+        if image_format not in ImageWriter.FORMATS:
+            raise Exception(f"The image format '{image_format}' isn't available (available : {ImageWriter.FORMATS}).")
+
+        self.DATA = (input_parser or get_input_parser()).get_data(index)
         self.BLANK_IMG = "./images/svg/blank.png"
-        self.WAITING_FILE = f"./images/waiting/{self.DATA['design']}-{template_number}.png"
+        self.scale = 1 if is_recreating else preview_scale
+        self.BLANK_CANVAS = get_blank_canvas(self.BLANK_IMG, canvas_size, background, self.scale)
+        self.IMAGE_FORMAT = image_format
+        self.WAITING_FILE = f"./images/waiting/{self.DATA['design']}-{template_number}.{image_format}"
+        self.WAITING_COMPRESSION = waiting_compression
+        self.OUTPUT_COMPRESSION = output_compression
 
         if is_recreating:
-            self.WAITING_FILE = f"./images/output/{self.DATA['design']}-{template_number}-{color}.png"
+            self.WAITING_FILE = get_output_path(self.DATA['design'], template_number, color, image_format)
         self.is_recreating = is_recreating
+        self.template_number = template_number
 
-        self.JSON_OUTPUT = JSONOutputParser(index)
+        self.INDEX = index
+        self.JSON_OUTPUT = JSONOutputParser(index) if is_recreating else None # Only a saved design is read.
         self.OUTPUT_DATA = self.JSON_OUTPUT.get_data() if is_recreating else None
+        self.LAYOUT_PLAN = None # Read once the SVG is opened.
 
         self.color = color
+        self.place_method = place_method
+
+        # Unique name of the job, so concurrent jobs never share their temporary files.
+        self.JOB_ID = f"{self.DATA['design']}-{template_number}-{color if is_recreating else 'waiting'}-{os.getpid()}"
 
 
     def build(self):
-        """ Build mutliple designs. """
-        blank_image = cv2.imread(self.BLANK_IMG, cv2.IMREAD_UNCHANGED)
-        self.img_result = blank_image[:, :, :].copy()
+        """ Build mutliple designs, return a TemplateResult with the parameters of the template ('save' saves it).
+            The image is written in the background, 'IMAGE_WRITER.flush()' waits for it (the template waits for it when tracing).
+        """
+        with TRACER.template(self.JOB_ID, self.__get_cache_counters):
+            self.img_result = self.BLANK_CANVAS.new_canvas()
+
+            self.editor = SVGEditor(self.DATA['design'], self.JOB_ID)
+            if self.is_recreating:
+                self.LAYOUT_PLAN = self.__get_saved_layout_plan()
+            with TRACER.stage("key_color"):
+                keyword_font_color = self.__get_keyword_color()
+
+            with TRACER.stage("text"):
+                self.__handle_text(keyword_font_color)
+            with TRACER.stage("image"):
+                self.__handle_image()
+            title, description = self.__handle_description()
+            self.__wait_traced_writes()
+
+        # Keep the parameters of the created image, with its layout plan when it is at full size.
+        layout = None
+        if self.scale == 1:
+            choices = {"font": self.font, "list_fonts_index": self.list_fonts_index, "type_writing": self.type_writing}
+            layout = self.__get_layout_plan(self.lines, keyword_font_color, self.image_place, choices)
+        
+        return TemplateResult(self.INDEX, self.WAITING_FILE, self.font, self.list_fonts_index, self.type_writing, title, description, layout)
 
-        self.editor = SVGEditor(self.DATA['design'])
-        keyword_font_color = self.editor.get_best_key_color()
 
-        self.__handle_text(keyword_font_color)
-        self.__handle_image()
-        title, description = self.__handle_description()
+    def build_colorways(self, colors:list):
+        """ Build the same design in several colors (only when recreating).
+            The text layout, the text masks, the icon place and the keyword color are computed once (or read from the saved layout plan),
+            then each color only colors the masks and draws its icon.
+            Return the list of the created files, written in the background ('IMAGE_WRITER.flush()' waits for them, the template when tracing).
+
+            Attributes :
+                colors -> list : colors of the designs (ex: ["white", "black"]).
+        """
+        with TRACER.template(self.JOB_ID, self.__get_cache_counters):
+            self.editor = SVGEditor(self.DATA['design'], self.JOB_ID)
+            self.LAYOUT_PLAN = self.__get_saved_layout_plan()
+            with TRACER.stage("key_color"):
+                keyword_font_color = self.__get_keyword_color()
+
+            # Lay out the text once, as masks.
+            text_creator = TextCreator(self.DATA['text'], self.DATA['keywords'], self.BLANK_CANVAS.new_canvas(), self.color, keyword_font_color, self.OUTPUT_DATA)
+            if self.LAYOUT_PLAN != None:
+                lines = self.LAYOUT_PLAN['lines']
+            else:
+                with TRACER.stage("text/layout"):
+                    lines = text_creator.layout_text(self.OUTPUT_DATA['type_writing'])
+            with TRACER.stage("text/draw"):
+                text_mask, outline_mask, keyword_mask = text_creator.draw_text_masks(lines)
+
+            x, y, w, h = self.__get_image_place([line['box'] for line in lines])
+
+            # Keep the layout, so the next re-creations only draw it.
+            if self.LAYOUT_PLAN == None:
+                self.JSON_OUTPUT.save_layout(self.__get_layout_plan(lines, keyword_font_color, (x, y, w, h), self.OUTPUT_DATA))
+
+            created_files = []
+            for color in colors:
+                output_image = self.BLANK_CANVAS.new_canvas()
+
+                # Color the text.
+                with TRACER.stage("text/blend"):
+                    text_color = self.__get_bgra_color(color)
+                    blend_color(output_image, text_color, text_mask)
+                    blend_color(output_image, text_color, outline_mask)
+                    blend_color(output_image, (*keyword_font_color, 255), keyword_mask)
+
+                # Draw the icon with the border of the color.
+                editor = SVGEditor(self.DATA['design'], self.JOB_ID)
+                with TRACER.stage("image/edit"):
+                    editor.draw_border(self.__get_border_color(color))
+                    editor.resize(w, h)
+                with TRACER.stage("image/rasterize"):
+                    icon_image = editor.to_array()
+                with TRACER.stage("image/overlay"):
+                    overlay_image_alpha(output_image, icon_image, x, y)
+
+                output_file = get_output_path(self.DATA['design'], self.template_number, color, self.IMAGE_FORMAT)
+                with TRACER.stage("image/hand_off"):
+                    IMAGE_WRITER.write(output_file, output_image, self.OUTPUT_COMPRESSION)
+                created_files.append(output_file)
+
+            self.editor.clear()
+            self.__wait_traced_writes()
+        return created_files
+
+
+    def __wait_traced_writes(self):
+        """ When tracing, wait for the images inside the template, so their encoding and writing (in the writer threads) are in its trace. """
+        if TRACER.enabled:
+            with TRACER.stage("image/wait_writes"):
+                IMAGE_WRITER.flush()
+
+
+    def __get_saved_layout_plan(self):
+        """ Get the layout plan saved with the design, or None if there is none
+            or if it was made for another version, canvas, input entry, SVG or font choices.
+        """
+        plan = self.OUTPUT_DATA.get('layout')
+
+        if plan == None or plan['version'] != self.LAYOUT_PLAN_VERSION or tuple(plan['canvas_size']) != tuple(self.BLANK_CANVAS.size):
+            return None
+        if plan.get('source') != self.__get_layout_source(self.OUTPUT_DATA):
+            return None
+        return plan
+
+
+    def __get_layout_source(self, choices:dict):
+        """ Get the hash of everything a layout plan is computed from : the input entry, the SVG and the random choices.
+
+            Attributes :
+                choices -> dict : 'font', 'list_fonts_index' and 'type_writing' of the design.
+        """
+        source = {
+            "input": self.DATA,
+            "svg": self.editor.SVG_HASH,
+            "font": choices['font'],
+            "list_fonts_index": choices['list_fonts_index'],
+            "type_writing": choices['type_writing']
+        }
+        return hashlib.sha256(json.dumps(source, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+    def __get_layout_plan(self, lines:list, keyword_font_color:tuple, image_place:tuple, choices:dict):
+        """ Get the resolved layout of a design, to save it and draw it again without any font fitting or placement.
+
+            Attributes :
+                lines -> list : lines returned by 'TextCreator.layout_text'.
+                keyword_font_color -> tuple : color of the keywords.
+                image_place -> tuple : 4-tuple x, y, width and height of the icon.
+                choices -> dict : 'font', 'list_fonts_index' and 'type_writing' of the design.
+        """
+        x, y, w, h = image_place
+        return {
+            "version": self.LAYOUT_PLAN_VERSION,
+            "source": self.__get_layout_source(choices),
+            "canvas_size": list(self.BLANK_CANVAS.size),
+            "keyword_color": [int(value) for value in keyword_font_color],
+            "lines": lines,
+            "text_positions": [list(line['box']) for line in lines],
+            "icon": {"x": int(x), "y": int(y), "w": int(w), "h": int(h)}
+        }
+
+
+    def __get_keyword_color(self):
+        """ Get the color of the keywords, from the layout plan when there is one. """
+        if self.LAYOUT_PLAN != None:
+            return tuple(self.LAYOUT_PLAN['keyword_color'])
+        return self.editor.get_best_key_color()
+
+
+    def __get_image_place(self, text_positions:list):
+        """ Get the x, y, width and height of the icon, from the layout plan when there is one.
+
+            Attributes :
+                text_positions -> list : list of 4-tuple that represents each text positions.
+        """
+        if self.LAYOUT_PLAN != None:
+            icon = self.LAYOUT_PLAN['icon']
+            return icon['x'], icon['y'], icon['w'], icon['h']
+
+        with TRACER.stage("image/place"):
+            return self.__find_image_place(text_positions)
 
-        # Save the created image to the output.
-        self.JSON_OUTPUT.add_list_fonts_index(self.list_fonts_index)
-        self.JSON_OUTPUT.add_description(title, description)
-        
-        return self.JSON_OUTPUT
+
+    def __get_cache_counters(self):
+        """ Get the counters of the caches used by a template, for its trace. """
+        return {
+            "font_cache.hits": FONT_CACHE.hits,
+            "font_cache.misses": FONT_CACHE.misses,
+            "raster_cache.hits": RASTER_CACHE.hits,
+            "raster_cache.misses": RASTER_CACHE.misses,
+            "key_color_cache.hits": SVGEditor.key_color_hits,
+            "key_color_cache.misses": SVGEditor.key_color_misses
+        }
+
+
+    def __get_bgra_color(self, color:str):
+        """ Get the BGRA value of a color name, in the channel order of the OpenCV images.
+
+            Attributes :
+                color -> str : color name or hexadecimal value.
+        """
+        red, green, blue, alpha = ImageColor.getcolor(color, "RGBA")
+        return blue, green, red, alpha
+
+
+    def __get_border_color(self, color:str):
+        """ Get the hexadecimal color of the icon border for a design color.
+
+            Attributes :
+                color -> str : color of the design.
+        """
+        return "#%02X%02X%02X" % ImageColor.getrgb(color)[:3]
+
+
+    def __find_image_place(self, text_positions:list):
+        """ Find the best place to put the image into the design, return its x, y, width and height.
+
+            Attributes :
+                text_positions -> list : list of 4-tuple that represents each text positions.
+        """
+        image_size = self.editor.get_svg_size()
+        reduce_ratio = max(1, round(100 * self.scale))
+        finder = PlaceFinder(text_positions, self.BLANK_CANVAS.size, image_size, True, reduce_ratio, self.place_method)
+        return finder.find_best_place()
 
 
     def __handle_text(self, keyword_font_color:str):
@@ -59,43 +290,38 @@ class DesignHandler:
             Attributes :
                 keyword_font_color -> str : font color to apply to the keyword.
         """
-        text_creator = TextCreator(self.DATA['text'], self.DATA['keywords'], self.img_result, self.color, keyword_font_color, self.OUTPUT_DATA)
+        text_creator = TextCreator(self.DATA['text'], self.DATA['keywords'], self.img_result, self.color, keyword_font_color, self.OUTPUT_DATA, self.scale)
 
         # Randomize the template.
         type_writing = random.randint(0, 1) == 0 if not self.is_recreating else self.OUTPUT_DATA['type_writing']
-        self.img_result, self.text_positions = text_creator.write_text(type_writing)
-        self.list_fonts_index = text_creator.CURRENT_LIST_FONTS_INDEX
-
-        self.JSON_OUTPUT.add_font(text_creator.USED_FONT)
-        self.JSON_OUTPUT.add_type_writing(type_writing)
-
-        # Save the image.
-        cv2.imwrite(self.WAITING_FILE, self.img_result)
+        lines = self.LAYOUT_PLAN['lines'] if self.LAYOUT_PLAN != None else None
+        self.img_result, self.text_positions = text_creator.write_text(type_writing, lines)
+        self.lines = text_creator.lines
+        self.list_fonts_index = text_creator.CURRENT_LIST_FONTS_INDEX if lines == None else self.OUTPUT_DATA['list_fonts_index']
+        self.font = text_creator.USED_FONT
+        self.type_writing = type_writing
 
 
     def __handle_image(self):
         """ Handle the design positionning. """
         # Find the best place to put the image into the design.
-        design_size = Image.open(self.BLANK_IMG).size
-        image_size = self.editor.get_svg_size()
-        finder = PlaceFinder(self.text_positions, design_size, image_size, True)
-        x, y, w, h = finder.find_best_place()
+        self.image_place = x, y, w, h = self.__get_image_place(self.text_positions)
 
         # Edit the image.
-        border_color = "#FFFFFF" if self.color == "white" else "#000000"
-        self.editor.draw_border(border_color)
-        self.editor.resize(w, h)
-        image_path = self.editor.convert_to_png()
+        with TRACER.stage("image/edit"):
+            self.editor.draw_border(self.__get_border_color(self.color))
+            self.editor.resize(w, h)
 
         # Create the design.
-        icon_image = cv2.imread(image_path, -1)
+        with TRACER.stage("image/rasterize"):
+            icon_image = self.editor.to_array()
 
-        alpha_mask = icon_image[:, :, 3] / 255.0
-        img_overlay = icon_image[:, :, :]
-        output_image = self.__overlay_image_alpha(self.img_result, img_overlay, x, y, alpha_mask)
+        with TRACER.stage("image/overlay"):
+            output_image = overlay_image_alpha(self.img_result, icon_image, x, y)
 
-        # Save the image.
-        cv2.imwrite(self.WAITING_FILE, output_image)
+        # Save the image in the background, the final designs are compressed the most.
+        with TRACER.stage("image/hand_off"):
+            IMAGE_WRITER.write(self.WAITING_FILE, output_image, self.OUTPUT_COMPRESSION if self.is_recreating else self.WAITING_COMPRESSION)
         self.editor.clear()
 
 
@@ -120,32 +346,3 @@ class DesignHandler:
         description = f"Add some fun to your [{first_keyword}] wardrobe with this funny [{first_keyword}] design or give it as the perfect gift!"
 
         return title, description
-
-
-    def __overlay_image_alpha(self, img, img_overlay, x, y, alpha_mask):
-        """ Overlay "img_overlay" onto "img" at (x, y) and blend using "alpha_mask". 
-
-            Code taken here : 
-                https://stackoverflow.com/questions/14063070/overlay-a-smaller-image-on-a-larger-image-python-opencv
-        """
-        # Image ranges
-        y1, y2 = max(0, y), min(img.shape[0], y + img_overlay.shape[0])
-        x1, x2 = max(0, x), min(img.shape[1], x + img_overlay.shape[1])
-
-        # Overlay ranges
-        y1o, y2o = max(0, -y), min(img_overlay.shape[0], img.shape[0] - y)
-        x1o, x2o = max(0, -x), min(img_overlay.shape[1], img.shape[1] - x)
-
-        # Exit if nothing to do
-        if y1 >= y2 or x1 >= x2 or y1o >= y2o or x1o >= x2o:
-            return
-
-        # Blend overlay within the determined ranges
-        img_crop = img[y1:y2, x1:x2]
-        img_overlay_crop = img_overlay[y1o:y2o, x1o:x2o]
-        alpha = alpha_mask[y1o:y2o, x1o:x2o, np.newaxis]
-        alpha_inv = 1.0 - alpha
-
-        img_crop[:] = alpha * img_overlay_crop + alpha_inv * img_crop
-
-        return img
@@ -0,0 +1,159 @@
+from concurrent.futures import ThreadPoolExecutor
+import os
+import re
+import threading
+
+from tracer import TRACER
+
+# OpenCV is only imported when an image is written, so the command lines can read the formats and the compressions without it.
+
+class ImageWriter:
+    """ Used to encode and write the images in background threads, while the next image is being made.
+        At most 'max_pending' images wait to be written, a new write blocks until one is done, so the memory stays bounded.
+    """
+
+    # PNG compression level of each compression, None for OpenCV's own settings.
+    # OpenCV's own PNG settings are by far the fastest, the maximum compression is 4-5 times slower for a few percents.
+    COMPRESSIONS = {
+        "fast": None,
+        "best": 9
+    }
+
+    # Formats the designs can be saved in (both keep the alpha channel, the WebP images are lossless).
+    FORMATS = ["png", "webp"]
+
+    def __init__(self, max_workers:int = 2, max_pending:int = 4):
+        """ Attributes :
+                max_workers -> int : number of threads encoding the images (OpenCV releases the GIL while encoding).
+                max_pending -> int : maximum number of images handed over and not written yet.
+        """
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+
+        self.__executor = None
+        self.__slots = threading.BoundedSemaphore(max_pending)
+        self.__futures = []
+        self.__lock = threading.Lock()
+
+
+    def write(self, path:str, image:object, compression = "fast"):
+        """ Hand an image over to be written, the image must not be modified afterwards.
+            The format is the one of the path extension ('.png', '.webp'...). Return the future of the write.
+
+            Attributes :
+                path -> str : path of the image.
+                image -> object : OpenCV image.
+                compression -> str/int : 'fast', 'best' or a PNG compression level from 0 to 9.
+        """
+        parameters = self.__get_parameters(path, compression)
+
+        # Wait for a free slot when too many images are waiting, counted in the trace of the template.
+        if not self.__slots.acquire(blocking=False):
+            TRACER.count("image_writer.waits")
+            self.__slots.acquire()
+        try:
+            with self.__lock:
+                if self.__executor == None:
+                    self.__executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="image-writer")
+                future = self.__executor.submit(self.__write, path, image, parameters)
+                self.__futures.append(future)
+        except Exception:
+            self.__slots.release()
+            raise
+
+        future.add_done_callback(lambda _: self.__slots.release())
+        return future
+
+
+    def flush(self):
+        """ Wait until every handed over image is written, raise the error of the first failed write. """
+        with self.__lock:
+            futures, self.__futures = self.__futures, []
+
+        errors = [future.exception() for future in futures]
+        errors = [error for error in errors if error != None]
+        if errors:
+            raise errors[0]
+
+
+    def __get_parameters(self, path:str, compression):
+        """ Get the OpenCV parameters of a format and a compression.
+
+            Attributes :
+                path -> str : path of the image, its extension gives the format.
+                compression -> str/int : 'fast', 'best' or a PNG compression level from 0 to 9.
+        """
+        import cv2
+
+        extension = os.path.splitext(path)[1].lower()
+        if extension == ".webp":
+            return [cv2.IMWRITE_WEBP_QUALITY, 101] # Lossless (only the color of the fully transparent pixels isn't kept).
+        if extension != ".png":
+            return []
+
+        if isinstance(compression, int):
+            if not 0 <= compression <= 9:
+                raise Exception(f"The PNG compression level '{compression}' must be between 0 and 9.")
+            return [cv2.IMWRITE_PNG_COMPRESSION, compression]
+
+        if compression not in self.COMPRESSIONS:
+            raise Exception(f"The compression '{compression}' doesn't exist (available : {list(self.COMPRESSIONS)} or a level from 0 to 9).")
+        level = self.COMPRESSIONS[compression]
+        return [] if level == None else [cv2.IMWRITE_PNG_COMPRESSION, level]
+
+
+    def __write(self, path:str, image:object, parameters:list):
+        """ Encode an image and write it, through a temporary file so it is never seen partially written. """
+        import cv2
+
+        # Timed in the trace of the template handing the image over, while it is open.
+        with TRACER.stage("image/encode"):
+            is_encoded, buffer = cv2.imencode(os.path.splitext(path)[1], image, parameters)
+        if not is_encoded:
+            raise Exception(f"The image '{path}' can't be encoded.")
+
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with TRACER.stage("image/write_file"):
+                with open(tmp_path, "wb") as image_file:
+                    image_file.write(buffer)
+                os.replace(tmp_path, path)
+        except Exception:
+            if os.path.isfile(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+
+
+def parse_compression(text:str):
+    """ Get a compression from a command line argument : 'fast', 'best' or a PNG compression level from 0 to 9.
+
+        Attributes :
+            text -> str : the argument.
+    """
+    compression = int(text) if text.isdigit() else text
+
+    # A ValueError is shown by argparse as an invalid argument.
+    if compression not in ImageWriter.COMPRESSIONS and compression not in range(10):
+        raise ValueError(f"The compression '{text}' doesn't exist.")
+    return compression
+
+
+
+def get_output_path(design:str, template_number:int, color:str, image_format:str = "png"):
+    """ Get the path of an output image of a design in one color.
+        Only the letters, digits, '-' and '_' of the color are kept in the name (ex: '#ff0000' -> 'ff0000').
+
+        Attributes :
+            design -> str : name of the design.
+            template_number -> int : number of the template.
+            color -> str : color name or hexadecimal value of the image.
+            image_format -> str : format of the image.
+    """
+    color_name = re.sub(r"[^0-9A-Za-z_-]", "", color)
+    return f"./images/output/{design}-{template_number}-{color_name}.{image_format}"
+
+
+
+# Writer shared by every design of the process.
+IMAGE_WRITER = ImageWriter()
@@ -4,18 +4,32 @@ import math
 class PlaceFinder:
     """ Used to find a place where to put an image into a design. """
 
-    def __init__(self, text_positions:list, design_size:tuple, image_size:tuple, has_to_be_centered:bool = False, reduce_ratio:int = 100):
+    METHODS = ["grid", "integral", "exact"]
+
+    # Number of rows or columns computed at once by the 'integral' method, so its temporary arrays stay small.
+    BLOCK_SIZE = 256
+
+    def __init__(self, text_positions:list, design_size:tuple, image_size:tuple, has_to_be_centered:bool = False, reduce_ratio:int = 100, method:str = "grid"):
         """ Attributes :
                 text_positions -> list : list of 4-tuple that represents each text positions.
                 design_size -> 2-tuple : size of the design.
                 image_size -> 2-tuple : size of the image to put in the design.
+                has_to_be_centered -> bool : center the image horizontally. 'exact' only searches the centered places,
+                                             'grid' and 'integral' search anywhere then center the place they found
+                                             (which can then cover a text), so the methods return different places.
                 reduce_ratio -> int : ratio to help reduce faster the size of the design (performance issue).
+                method -> str : placement algorithm, 'grid' (shrink and scan), 'integral' (occupancy grid and summed-area table)
+                                or 'exact' (empty rectangles computed from the text boxes edges).
         """
+        if method not in self.METHODS:
+            raise Exception(f"Unknown placement method '{method}', choose one of {self.METHODS}.")
+
         self.text_positions = text_positions
         self.design_size = design_size
         self.has_to_be_centered = has_to_be_centered
         self.reduce_ratio = reduce_ratio
         self.step = max(1, self.reduce_ratio // 10)
+        self.method = method
 
         # Find the ratio of the image.
         if image_size[0] > image_size[1]:
@@ -28,8 +42,14 @@ class PlaceFinder:
 
     def find_best_place(self):
         """ Find the best place where to put the image.
-            Return a 4-tuple representing the x, y, width and height of the best position.
+            Return a 4-tuple representing the x, y, width and height of the best position, False if there is none.
+            A centered place is re-centered after the search with 'grid' and 'integral', and searched as it is with 'exact'.
          """
+        if self.method == "integral":
+            return self.__find_best_place_integral()
+        if self.method == "exact":
+            return self.__find_best_place_exact()
+
         while self.width > 0 and self.height > 0:
             w, h = math.ceil(self.width), math.ceil(self.height)
             result = self.__find_overlap_by_size(w, h)
@@ -44,6 +64,191 @@ class PlaceFinder:
         return False
 
 
+    def __find_best_place_integral(self):
+        """ Find the best place with an occupancy grid of the texts and its summed-area table.
+            Every position is tested at once for a size, and the size is found by a binary search
+            on the length of the image, so the result is at least as large as the 'grid' one.
+        """
+        table = self.__build_summed_area_table()
+
+        # Largest length that can be placed, on the longest side of the image.
+        low, high = 0, math.ceil(self.width if self.ratio[0] == 1 else self.height)
+        result = None
+
+        while low < high:
+            middle = (low + high + 1) // 2
+            place = self.__find_free_position(table, *self.__get_size_by_length(middle))
+
+            if place != None:
+                low, result = middle, place
+            else:
+                high = middle - 1
+
+        if result == None:
+            return False
+        return self.__center_result(result)
+
+
+    def __get_size_by_length(self, length:int):
+        """ Get the size of the image when its longest side has this length.
+
+            Attributes :
+                length -> int : length of the longest side of the image.
+        """
+        return math.ceil(length * self.ratio[0]), math.ceil(length * self.ratio[1])
+
+
+    def __build_summed_area_table(self):
+        """ Rasterize the text positions into an occupancy grid and return its summed-area table. """
+        design_width, design_height = self.design_size
+        occupancy = np.zeros((design_height, design_width), dtype=np.uint8)
+
+        for text_x, text_y, text_width, text_height in self.text_positions:
+            x1, x2 = max(0, math.floor(text_x)), min(design_width, math.ceil(text_x + text_width))
+            y1, y2 = max(0, math.floor(text_y)), min(design_height, math.ceil(text_y + text_height))
+
+            # Skip the boxes outside of the design, a negative end would wrap around.
+            if x1 < x2 and y1 < y2:
+                occupancy[y1:y2, x1:x2] = 1
+
+        # Add a first row and column of zeros so any rectangle sum needs only four lookups.
+        # The rows are summed by blocks (NumPy converts the whole input to the type of the sums), then added to each other in place.
+        table = np.zeros((design_height + 1, design_width + 1), dtype=np.int32)
+        for y in range(0, design_height, self.BLOCK_SIZE):
+            np.cumsum(occupancy[y:y + self.BLOCK_SIZE], axis=1, dtype=np.int32, out=table[y + 1:y + 1 + self.BLOCK_SIZE, 1:])
+        for y in range(2, design_height + 1):
+            np.add(table[y], table[y - 1], out=table[y])
+
+        return table
+
+
+    def __find_free_position(self, table:object, w:int, h:int):
+        """ Find the first free position for a rectangle, scanning columns from left to right like the 'grid' method.
+            The positions are tested by blocks of columns, so only a block of the sums is in memory at once.
+
+            Attributes :
+                table -> object : summed-area table of the occupancy grid.
+                w -> int : width of the rectangle to place.
+                h -> int : height of the rectangle to place.
+        """
+        design_height, design_width = table.shape[0] - 1, table.shape[1] - 1
+        if w <= 0 or h <= 0 or w > design_width or h > design_height:
+            return None
+
+        # Number of text pixels under the rectangle for the top-left positions of a block of columns, 0 where it is free.
+        # The blocks on the right of the first free column are never computed.
+        number_of_columns = design_width - w + 1
+        for x in range(0, number_of_columns, self.BLOCK_SIZE):
+            end = min(number_of_columns, x + self.BLOCK_SIZE)
+            covered = table[h:, x + w:end + w] - table[:-h, x + w:end + w]
+            covered -= table[h:, x:end]
+            covered += table[:-h, x:end]
+            free = covered == 0
+
+            free_columns = np.flatnonzero(free.any(axis=0))
+            if len(free_columns) != 0:
+                column = int(free_columns[0])
+                return x + column, int(np.argmax(free[:, column])), w, h
+
+        return None
+
+
+    def __find_best_place_exact(self):
+        """ Find the largest place from the edges of the text boxes, whatever the resolution of the design.
+            The largest empty rectangle can always be moved up and left until it touches a text box or the border,
+            so its top-left corner is on the left / top border or on the right / bottom edge of a text box.
+        """
+        design_width, design_height = self.design_size
+        boxes = [(x, y, x + w, y + h) for x, y, w, h in self.text_positions]
+
+        # Candidate top-left corners of the empty rectangles.
+        corners_x = sorted(set([0] + [math.ceil(box[2]) for box in boxes if 0 < box[2] < design_width]))
+        corners_y = sorted(set([0] + [math.ceil(box[3]) for box in boxes if 0 < box[3] < design_height]))
+
+        best_length, result = 0, None
+        for y in corners_y:
+            if self.has_to_be_centered:
+                length = self.__get_centered_length_at(y, boxes)
+                x = (design_width - self.__get_size_by_length(length)[0]) // 2
+                if length > best_length:
+                    best_length, result = length, (x, y)
+                continue
+
+            for x in corners_x:
+                length = self.__get_length_at(x, y, boxes)
+                if length > best_length or (length == best_length and result != None and x < result[0]):
+                    best_length, result = length, (x, y)
+
+        if result == None:
+            return False
+        return (*result, *self.__get_size_by_length(best_length))
+
+
+    def __get_length_at(self, x:int, y:int, boxes:list):
+        """ Get the largest length of the image when its top-left corner is at (x, y).
+
+            Attributes :
+                x -> int : x position of the top-left corner.
+                y -> int : y position of the top-left corner.
+                boxes -> list : list of 4-tuple (x1, y1, x2, y2) of the text boxes.
+        """
+        length = self.__get_length_by_size(self.design_size[0] - x, self.design_size[1] - y)
+
+        for x1, y1, x2, y2 in boxes:
+            # The box is on the left or above the corner.
+            if x2 <= x or y2 <= y:
+                continue
+
+            # Otherwise the image has to end on the left of the box or above it.
+            length = min(length, max(self.__get_length_by_size(x1 - x, math.inf), self.__get_length_by_size(math.inf, y1 - y)))
+
+        return length
+
+
+    def __get_centered_length_at(self, y:int, boxes:list):
+        """ Get the largest length of the image horizontally centered, when its top is at y.
+
+            Attributes :
+                y -> int : y position of the top of the image.
+                boxes -> list : list of 4-tuple (x1, y1, x2, y2) of the text boxes.
+        """
+        design_width = self.design_size[0]
+        length = self.__get_length_by_size(design_width, self.design_size[1] - y)
+
+        for x1, y1, x2, y2 in boxes:
+            if y2 <= y:
+                continue
+
+            # With x = (design_width - w) // 2, the image ends before x1 or starts after x2 up to a maximum width.
+            max_width = max(2 * math.floor(x1) + 1 - design_width, design_width - 2 * math.ceil(x2))
+            length = min(length, max(self.__get_length_by_size(max_width, math.inf), self.__get_length_by_size(math.inf, y1 - y)))
+
+        return length
+
+
+    def __get_length_by_size(self, max_width:float, max_height:float):
+        """ Get the largest length of the image that fits in a size.
+
+            Attributes :
+                max_width -> float : maximum width of the image.
+                max_height -> float : maximum height of the image.
+        """
+        length = math.ceil(self.width if self.ratio[0] == 1 else self.height)
+
+        for max_size, ratio in zip((max_width, max_height), self.ratio):
+            if max_size == math.inf:
+                continue
+            if max_size < 1:
+                return 0
+            length = min(length, math.floor(math.floor(max_size) / ratio))
+
+        # Protect against the rounding of the division.
+        while length > 0 and (self.__get_size_by_length(length)[0] > max_width or self.__get_size_by_length(length)[1] > max_height):
+            length -= 1
+
+        return length
+
+
     def __center_result(self, result:tuple):
         """ Center the received result.
         
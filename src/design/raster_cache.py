@@ -0,0 +1,150 @@
+from collections import OrderedDict
+import hashlib
+import os
+import os.path
+
+import numpy as np
+
+class RasterCache:
+    """ Used to keep the rendered SVG icons on the disk, so the same icon is rasterized only once.
+        The size of the rasters is tracked in memory : the folder is only listed once, then again when the cache is full.
+        The processes sharing the folder each track the rasters they know, the listing catches up with the others.
+    """
+
+    # Share of the maximum size kept after an eviction, so the folder isn't listed again at the next raster.
+    EVICTION_RATIO = 0.8
+
+    def __init__(self, cache_folder:str = "./images/cache/", max_bytes:int = 512 * 1024 * 1024):
+        """ Attributes :
+                cache_folder -> str : folder where the rasters are saved.
+                max_bytes -> int : maximum size of the cache on the disk, the least recently used rasters are removed above it.
+        """
+        self.CACHE_FOLDER = cache_folder
+        self.max_bytes = max_bytes
+
+        self.hits = 0
+        self.misses = 0
+
+        # Size of each known raster by key, from the least to the most recently used (None until the folder is listed).
+        self.__sizes = None
+        self.__total_bytes = 0
+
+
+    def get_key(self, svg_hash:str, width:float, height:float, border_color:str, resolution:int):
+        """ Get the key of a raster from everything that changes its pixels.
+
+            Attributes :
+                svg_hash -> str : hash of the content of the SVG file.
+                width -> float : width of the rendered SVG (None if it is not resized).
+                height -> float : height of the rendered SVG (None if it is not resized).
+                border_color -> str : color of the border (None if there is no border).
+                resolution -> int : resolution of the rasterization.
+        """
+        description = f"{svg_hash}|{width}|{height}|{border_color}|{resolution}"
+        return hashlib.sha256(description.encode("utf-8")).hexdigest()
+
+
+    def get(self, key:str):
+        """ Get a raster from the cache, or None if it is not in it.
+
+            Attributes :
+                key -> str : key of the raster.
+        """
+        raster_path = self.__get_path(key)
+
+        try:
+            raster = np.load(raster_path)
+            # Mark the raster as recently used.
+            os.utime(raster_path)
+        except (OSError, ValueError, EOFError):
+            # Missing, removed by another process or partially written.
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        if self.__sizes != None and key in self.__sizes:
+            self.__sizes.move_to_end(key)
+        return raster
+
+
+    def put(self, key:str, raster:object):
+        """ Save a raster in the cache.
+
+            Attributes :
+                key -> str : key of the raster.
+                raster -> object : NumPy array of the rendered image.
+        """
+        os.makedirs(self.CACHE_FOLDER, exist_ok=True)
+
+        # Write to a temporary file first so a concurrent reader never sees a partial raster.
+        raster_path = self.__get_path(key)
+        tmp_path = f"{raster_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as raster_file:
+            np.save(raster_file, raster)
+        os.replace(tmp_path, raster_path)
+
+        if self.__sizes == None:
+            self.__list_folder()
+        else:
+            size = os.path.getsize(raster_path)
+            self.__total_bytes += size - self.__sizes.pop(key, 0)
+            self.__sizes[key] = size
+
+        if self.__total_bytes > self.max_bytes:
+            self.__evict()
+
+
+    def __get_path(self, key:str):
+        """ Get the path of a raster file.
+
+            Attributes :
+                key -> str : key of the raster.
+        """
+        return f"{self.CACHE_FOLDER}{key}.npy"
+
+
+    def __list_folder(self):
+        """ Read the size of every raster of the folder, sorted from the least to the most recently used. """
+        entries = []
+        for filename in os.listdir(self.CACHE_FOLDER):
+            if not filename.endswith(".npy"):
+                continue
+
+            try:
+                stat = os.stat(self.CACHE_FOLDER + filename)
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime_ns, filename[:-len(".npy")], stat.st_size))
+
+        self.__sizes = OrderedDict((key, size) for _, key, size in sorted(entries))
+        self.__total_bytes = sum(self.__sizes.values())
+
+
+    def __evict(self):
+        """ Remove the least recently used rasters until the cache fits in a share of its size.
+            The folder is listed again first, to count the rasters of the other processes.
+        """
+        self.__list_folder()
+
+        while self.__sizes and self.__total_bytes > self.max_bytes * self.EVICTION_RATIO:
+            key, size = self.__sizes.popitem(last=False)
+            try:
+                os.remove(self.__get_path(key))
+            except FileNotFoundError:
+                pass
+            self.__total_bytes -= size
+
+
+    def get_stats(self):
+        """ Get the usage counters of the cache. """
+        requests = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / requests if requests else 0.0,
+            "max_bytes": self.max_bytes
+        }
+
+
+# Cache shared by every SVGEditor of the process.
+RASTER_CACHE = RasterCache()
@@ -1,28 +1,43 @@
 import xml.etree.ElementTree as ET
+import hashlib
+import math
 import os
 import os.path
 
-from PIL import Image, ImageDraw, ImageFilter
+import numpy as np
 
-import pywhatkit as kt
+from design.raster_cache import RASTER_CACHE
 
 class SVGEditor:
     """ Used to edit the raw SGV icon. """
 
-    def __init__(self, filename:str):
+    # Best keyword colors already computed, by SVG content hash, and the usage counters of this memo.
+    KEY_COLORS = {}
+    key_color_hits = 0
+    key_color_misses = 0
+
+    def __init__(self, filename:str, job_id:str = None):
         """ Attributes :
                 filename -> str : name of the SVG file (WITHOUT THE EXTENSION /!\).
+                job_id -> str : name of the job, its temporary files are kept in their own folder.
         """
         self.RAW_FILENAME = filename
         self.SVG_FILE_PATH = "./images/svg/"
-        self.TMP_FILE_PATH = "./images/tmp/"
+        self.TMP_FILE_PATH = "./images/tmp/" if job_id == None else f"./images/tmp/{job_id}/"
+        self.job_id = job_id
 
         self.SVG_FILENAME = self.SVG_FILE_PATH + filename + ".svg"
-        self.SVG_TMP_FILENAME = self.TMP_FILE_PATH + self.RAW_FILENAME + ".svg"
 
         # Open the SVG file as XML.
-        self.__tree = ET.parse(self.SVG_FILENAME)
-        self.__root = self.__tree.getroot()
+        with open(self.SVG_FILENAME, "rb") as svg_file:
+            svg_content = svg_file.read()
+        self.SVG_HASH = hashlib.sha256(svg_content).hexdigest()
+        self.__root = ET.fromstring(svg_content)
+        self.__tree = ET.ElementTree(self.__root)
+
+        # Edits applied to the SVG, they identify its rendered raster.
+        self.border_color = None
+        self.size = None, None
 
 
     def resize(self, max_new_width:float, max_new_height:float):
@@ -41,14 +56,13 @@ class SVGEditor:
         # Edit the XML tree.
         self.__root.set("width", str(width * factor))
         self.__root.set("height", str(height * factor))
+        self.size = width * factor, height * factor
 
         # Change also the viewbox to take into account the border.
         border_size = 3
         x, y, new_width, new_height = -border_size / 2, -border_size / 2, str(width + border_size), str(height + border_size)
         self.__root.set("viewBox", f"{x} {y} {new_width} {new_height}")
 
-        self.__save_tmp_svg()
-
 
     def get_svg_size(self):
         """ Get the size of the SVG image. """
@@ -56,12 +70,55 @@ class SVGEditor:
         return float(width), float(height)
 
 
-    def __save_tmp_svg(self):
-        """ Rewrite the XML tree to a new SVG file. """
+    def get_svg_blob(self):
+        """ Get the edited XML tree as SVG bytes, without writing any file. """
         ET.register_namespace("", "http://www.w3.org/2000/svg")
+        return ET.tostring(self.__root)
+
+
+    def __rasterize(self, blob_format:str, resolution:int = 96):
+        """ Rasterize the edited XML tree in memory.
+            Return a 3-tuple with the blob of the image in the asked format, its width and its height.
+            Thanks to this amazing person : https://stackoverflow.com/a/62867864
+
+            ---
+
+            Attributes :
+                blob_format -> str : ImageMagick format of the blob (ex: 'png32', 'BGRA').
+                resolution -> int : resolution of the image, 96 seems to keep the appropriate size.
+        """
+        from wand.api import library
+        import wand.color
+        import wand.image
+
+        with wand.image.Image() as image:
+            with wand.color.Color('transparent') as background_color:
+                library.MagickSetBackgroundColor(image.wand, background_color.resource) 
+            image.read(blob = self.get_svg_blob(), resolution = resolution)
+            image.depth = 8
+            return image.make_blob(blob_format), image.width, image.height
+
+
+    def to_array(self, resolution:int = 96, use_cache:bool = True):
+        """ Rasterize the edited SVG straight to a BGRA NumPy array (the layout of cv2.imread(path, -1)).
+            The raster is taken from the shared raster cache when the same SVG was already rendered with the same edits.
+
+            Attributes :
+                resolution -> int : resolution of the image, 96 seems to keep the appropriate size.
+                use_cache -> bool : look for the raster in the cache and save it there.
+        """
+        if use_cache:
+            key = RASTER_CACHE.get_key(self.SVG_HASH, *self.size, self.border_color, resolution)
+            raster = RASTER_CACHE.get(key)
+            if raster is not None:
+                return raster
 
-        with open(self.SVG_TMP_FILENAME, 'wb') as svg_file:
-            self.__tree.write(svg_file)
+        pixels, width, height = self.__rasterize("BGRA", resolution)
+        raster = np.frombuffer(pixels, dtype=np.uint8).reshape(height, width, 4)
+
+        if use_cache:
+            RASTER_CACHE.put(key, raster)
+        return raster
 
 
     def convert_to_png(self):
@@ -71,33 +128,17 @@ class SVGEditor:
 
     def __convert_to_png(self, output:bool = False, resolution:int = 96):
         """ Convert a SVG file to a PNG file.
-            Thanks to this amazing person : https://stackoverflow.com/a/62867864
-
-            ---
 
             Attributes :
                 output -> bool : it is an output file or a temporary file ?
                 resolution -> int : resolution of the PNG image, 96 seems to keep the appropriate size.
         """
-        from wand.api import library
-        import wand.color
-        import wand.image
-
-        # Create the SVG temporary file if it doesn't exists.
-        if not os.path.isfile(self.SVG_TMP_FILENAME):
-            self.__save_tmp_svg() 
-
-        with open(self.SVG_TMP_FILENAME, "r") as svg_file:
-            with wand.image.Image() as image:
-                with wand.color.Color('transparent') as background_color:
-                    library.MagickSetBackgroundColor(image.wand, background_color.resource) 
-                svg_blob = svg_file.read().encode('utf-8')
-                image.read(blob = svg_blob, resolution = resolution)
-                png_image = image.make_blob("png32")
+        png_image = self.__rasterize("png32", resolution)[0]
 
         # Decide the folder in which save the image.
         image_png_path = self.TMP_FILE_PATH + self.RAW_FILENAME + ".png" if output else self.TMP_FILE_PATH + self.RAW_FILENAME + ".png"
 
+        os.makedirs(self.TMP_FILE_PATH, exist_ok=True)
         with open(image_png_path, "wb") as out:
             out.write(png_image)
 
@@ -105,10 +146,16 @@ class SVGEditor:
 
 
     def clear(self):
-        """ Clear the temporary created file. """
+        """ Clear the temporary created file (only the ones of the job when there is one). """
+        if not os.path.isdir(self.TMP_FILE_PATH):
+            return
+
         for filename in os.listdir(self.TMP_FILE_PATH):
             os.remove(self.TMP_FILE_PATH + filename)
 
+        if self.job_id != None:
+            os.rmdir(self.TMP_FILE_PATH)
+
 
     def draw_border(self, color:str = "#FFFFFF"):
         """ Draw a border around the SVG image. 
@@ -121,29 +168,43 @@ class SVGEditor:
         new_style = style_to_add if not current_style else current_style + ";" + style_to_add
 
         self.__root.set("style", new_style)
-        self.__save_tmp_svg()
+        self.border_color = color
         
 
-    def __get_colors(self, amount:int = 5):
+    def __get_colors(self, amount:int = 5, max_side:int = 256):
         """ Get the colors from the SVG file in a sorted list of tuples. 
         
             Attributes :
                 amount -> str : amount of colors to put in the list.
+                max_side -> int : the raster is sampled down to about this size to count the colors.
         """
-        tmp_png = self.__convert_to_png()
+        raster = self.to_array()
 
-        # Retrieve the colors and sort the list.
-        png_image = Image.open(tmp_png)
-        image_pixel_number = png_image.size[0] * png_image.size[1]
-        colors = png_image.convert('RGB').getcolors(maxcolors=image_pixel_number)
-        sorted_colors = sorted(colors, key=lambda x: x[0], reverse=True)
+        # Keep one pixel over 'step', which keeps the exact colors unlike an interpolation.
+        step = max(1, math.ceil(max(raster.shape[:2]) / max_side))
+        pixels = raster[::step, ::step, :3].reshape(-1, 3).astype(np.uint32)
 
-        os.remove(tmp_png)
-        return sorted_colors[:amount]
+        # Pack each BGR pixel into one RGB integer and count them.
+        packed_colors = (pixels[:, 2] << 16) | (pixels[:, 1] << 8) | pixels[:, 0]
+        colors, counts = np.unique(packed_colors, return_counts=True)
+
+        # Only sort the most frequent colors.
+        amount = min(amount, len(colors))
+        best_indexes = np.argpartition(counts, len(counts) - amount)[len(counts) - amount:]
+        best_indexes = best_indexes[np.argsort(-counts[best_indexes], kind="stable")]
+
+        return [(int(counts[i]), (int(colors[i] >> 16), int(colors[i] >> 8 & 255), int(colors[i] & 255))) for i in best_indexes]
 
 
     def get_best_key_color(self):
-        """ Get the best color for keyword. """
+        """ Get the best color for keyword.
+            It only depends on the SVG content, so it is computed once per process for each SVG.
+        """
+        if self.SVG_HASH in SVGEditor.KEY_COLORS:
+            SVGEditor.key_color_hits += 1
+            return SVGEditor.KEY_COLORS[self.SVG_HASH]
+        SVGEditor.key_color_misses += 1
+
         colors = self.__get_colors()
 
         # Remove black and white colors.
@@ -156,6 +217,8 @@ class SVGEditor:
 
         # Inverse color.
         best_color = best_color[2], best_color[1], best_color[0]
+
+        SVGEditor.KEY_COLORS[self.SVG_HASH] = best_color
         return best_color
 
 
@@ -165,6 +228,12 @@ class SVGEditor:
             Attributes :
                 color -> str : color of the border.
         """
+        # Only imported when needed : pywhatkit is slow to import, may reach the network and writes 'pywhatkit_dbs.txt'.
+        from PIL import Image, ImageDraw
+        import pywhatkit as kt
+        if os.path.isfile("pywhatkit_dbs.txt"):
+            os.remove("pywhatkit_dbs.txt")
+
         tmp_png = self.__convert_to_png()
         result = kt.image_to_ascii_art(tmp_png, "output")
 
@@ -0,0 +1,96 @@
+import hashlib
+import json
+import os
+import os.path
+
+# Version of the drawing pipeline, to change when the code draws the designs differently so every design is built again.
+PIPELINE_VERSION = 1
+
+class BuildManifest:
+    """ Used to remember the hash of everything each output image was built from, to only build again the changed ones. """
+
+    def __init__(self, manifest_path:str = "./data/build-manifest.json", svg_folder:str = "./images/svg/", font_folder:str = "./fonts/",
+                 blank_image:str = "./images/svg/blank.png"):
+        """ Attributes :
+                manifest_path -> str : path of the manifest JSON.
+                svg_folder -> str : folder of the SVG icons.
+                font_folder -> str : folder containing a sub-folder for each font family.
+                blank_image -> str : blank image the designs are drawn on.
+        """
+        self.MANIFEST_PATH = manifest_path
+        self.SVG_FOLDER = svg_folder
+        self.FONT_FOLDER = font_folder
+        self.BLANK_IMAGE = blank_image
+
+        self.outputs = {}
+        if os.path.isfile(manifest_path):
+            with open(manifest_path) as json_file:
+                self.outputs = json.load(json_file)
+
+        # Hashes of the files already read, each file is only hashed once.
+        self.__file_hashes = {}
+
+
+    def get_hash(self, input_data:dict, output_data:dict, color:str):
+        """ Get the hash of everything an output image is built from.
+
+            Attributes :
+                input_data -> dict : entry of the design in the input catalog.
+                output_data -> dict : saved design (its layout plan is left out, it only comes from the other inputs).
+                color -> str : color of the output image.
+        """
+        saved_design = {key: value for key, value in output_data.items() if key != 'layout'}
+        font_folder = os.path.join(self.FONT_FOLDER, output_data['font'])
+
+        description = {
+            "pipeline_version": PIPELINE_VERSION,
+            "input": input_data,
+            "output": saved_design,
+            "color": color,
+            "svg": self.__get_file_hash(os.path.join(self.SVG_FOLDER, input_data['design'] + ".svg")),
+            "blank": self.__get_file_hash(self.BLANK_IMAGE),
+            "fonts": {filename: self.__get_file_hash(os.path.join(font_folder, filename)) for filename in sorted(os.listdir(font_folder)) if filename.endswith(".ttf")}
+        }
+        return hashlib.sha256(json.dumps(description, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+    def is_up_to_date(self, output_path:str, input_hash:str):
+        """ See if an output image exists and was built from the same inputs.
+
+            Attributes :
+                output_path -> str : path of the output image.
+                input_hash -> str : hash of its current inputs.
+        """
+        return self.outputs.get(output_path) == input_hash and os.path.isfile(output_path)
+
+
+    def record(self, output_path:str, input_hash:str):
+        """ Remember the inputs of a built output image (saved by 'save').
+
+            Attributes :
+                output_path -> str : path of the output image.
+                input_hash -> str : hash of its inputs.
+        """
+        self.outputs[output_path] = input_hash
+
+
+    def save(self):
+        """ Write the manifest, through a temporary file so it is never partially written. """
+        os.makedirs(os.path.dirname(os.path.abspath(self.MANIFEST_PATH)), exist_ok=True)
+
+        tmp_path = f"{self.MANIFEST_PATH}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as json_file:
+            json_file.write(json.dumps(self.outputs, indent=4, sort_keys=True))
+        os.replace(tmp_path, self.MANIFEST_PATH)
+
+
+    def __get_file_hash(self, path:str):
+        """ Get the hash of the content of a file, read only once.
+
+            Attributes :
+                path -> str : path of the file.
+        """
+        if path not in self.__file_hashes:
+            with open(path, "rb") as content_file:
+                self.__file_hashes[path] = hashlib.sha256(content_file.read()).hexdigest()
+        return self.__file_hashes[path]
@@ -0,0 +1,220 @@
+from contextlib import closing
+import os
+import socket
+import sqlite3
+import time
+
+class JobQueue:
+    """ Used to keep the jobs of a long generation run in a SQLite database, so the run can be resumed after a crash.
+        A worker claims a job with a lease : if it dies, the lease expires and another worker takes the job again.
+        Many processes (or machines sharing the folder, on a file system where SQLite locking works) can use it at the same time.
+        The database uses a rollback journal : the WAL mode keeps its index in shared memory, so it only works on one machine.
+    """
+
+    STATUSES = ["pending", "running", "done", "failed"]
+
+    def __init__(self, database_path:str = "./data/jobs.sqlite", max_attempts:int = 3):
+        """ Attributes :
+                database_path -> str : path of the SQLite database.
+                max_attempts -> int : number of times a job is tried before it is failed.
+        """
+        self.DATABASE_PATH = database_path
+        self.max_attempts = max_attempts
+
+        with closing(self.__connect()) as connection:
+            # The journal mode is kept in the database file (a database made in WAL mode is converted back).
+            connection.execute("PRAGMA journal_mode=DELETE")
+            connection.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id INTEGER PRIMARY KEY,
+                    design_index INTEGER NOT NULL,
+                    template_number INTEGER NOT NULL,
+                    colors TEXT NOT NULL,
+                    preview_scale REAL NOT NULL DEFAULT 1,
+                    status TEXT NOT NULL DEFAULT 'pending',
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    worker TEXT,
+                    lease_until REAL,
+                    error TEXT,
+                    seconds REAL,
+                    updated REAL,
+                    UNIQUE (design_index, template_number, colors)
+                )
+            """)
+            connection.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, id)")
+
+
+    def __connect(self):
+        """ Open a connection to the database, waiting for the other workers instead of failing. """
+        connection = sqlite3.connect(self.DATABASE_PATH, timeout=60, isolation_level=None)
+        connection.execute("PRAGMA busy_timeout=60000")
+        return connection
+
+
+    def enqueue(self, jobs:list, preview_scale:float = 1, requeue:bool = False):
+        """ Add jobs to the queue. Return a 2-tuple with the number of added jobs and of jobs queued again.
+            A job already in the queue is kept as it is, unless 'requeue' is set : it is then pending again with all its attempts
+            and the new preview scale (a running job is always kept, its worker holds it).
+
+            Attributes :
+                jobs -> list : list of 3-tuple (index, template number, colors), the colors are None for a template.
+                preview_scale -> float : scale of the templates.
+                requeue -> bool : queue again the jobs already done, failed or pending.
+        """
+        rows = [(index, template_number, self.__join_colors(colors), preview_scale, time.time()) for index, template_number, colors in jobs]
+
+        query = "INSERT INTO jobs (design_index, template_number, colors, preview_scale, updated) VALUES (?, ?, ?, ?, ?)"
+        if requeue:
+            query += (
+                " ON CONFLICT (design_index, template_number, colors) DO UPDATE SET status = 'pending', attempts = 0, worker = NULL, lease_until = NULL,"
+                " error = NULL, seconds = NULL, preview_scale = excluded.preview_scale, updated = excluded.updated WHERE jobs.status != 'running'"
+            )
+        else:
+            query = query.replace("INSERT", "INSERT OR IGNORE", 1)
+
+        with closing(self.__connect()) as connection:
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                count_before = connection.execute("SELECT COUNT(*) FROM jobs").fetchone()[0]
+                changes_before = connection.total_changes
+                connection.executemany(query, rows)
+                added_jobs = connection.execute("SELECT COUNT(*) FROM jobs").fetchone()[0] - count_before
+                requeued_jobs = connection.total_changes - changes_before - added_jobs
+                connection.execute("COMMIT")
+            except Exception:
+                connection.execute("ROLLBACK")
+                raise
+
+        return added_jobs, requeued_jobs
+
+
+    def claim(self, worker:str, lease_seconds:float = 600):
+        """ Take the next pending job (or a running one whose worker stopped renewing its lease).
+            Return a dict with the job, or None if there is no job to do.
+
+            Attributes :
+                worker -> str : name of the worker taking the job.
+                lease_seconds -> float : time the job is kept by the worker without renewing the lease.
+        """
+        now = time.time()
+
+        with closing(self.__connect()) as connection:
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                # Jobs of dead workers with no attempt left are failed.
+                connection.execute(
+                    "UPDATE jobs SET status = 'failed', error = 'The lease of the job expired.', updated = ? WHERE status = 'running' AND lease_until < ? AND attempts >= ?",
+                    (now, now, self.max_attempts)
+                )
+
+                row = connection.execute(
+                    "SELECT id, design_index, template_number, colors, preview_scale, attempts FROM jobs "
+                    "WHERE status = 'pending' OR (status = 'running' AND lease_until < ?) ORDER BY id LIMIT 1",
+                    (now,)
+                ).fetchone()
+
+                if row != None:
+                    connection.execute(
+                        "UPDATE jobs SET status = 'running', worker = ?, lease_until = ?, attempts = attempts + 1, updated = ? WHERE id = ?",
+                        (worker, now + lease_seconds, now, row[0])
+                    )
+                connection.execute("COMMIT")
+            except Exception:
+                connection.execute("ROLLBACK")
+                raise
+
+        if row == None:
+            return None
+
+        job_id, index, template_number, colors, preview_scale, attempts = row
+        return {
+            "id": job_id,
+            "index": index,
+            "template_number": template_number,
+            "colors": self.__split_colors(colors),
+            "preview_scale": preview_scale,
+            "attempt": attempts + 1
+        }
+
+
+    def renew(self, job_id:int, worker:str, lease_seconds:float = 600):
+        """ Extend the lease of a running job. Return False if the job isn't held by the worker anymore.
+
+            Attributes :
+                job_id -> int : id of the job.
+                worker -> str : name of the worker holding the job.
+                lease_seconds -> float : new time the job is kept from now.
+        """
+        with closing(self.__connect()) as connection:
+            cursor = connection.execute(
+                "UPDATE jobs SET lease_until = ? WHERE id = ? AND worker = ? AND status = 'running'",
+                (time.time() + lease_seconds, job_id, worker)
+            )
+            return cursor.rowcount == 1
+
+
+    def finish(self, job_id:int, worker:str, seconds:float, error:str = None):
+        """ Mark a job as done, or as failed (pending again while it has attempts left).
+            Return False if the job isn't held by the worker anymore, its result is then ignored.
+
+            Attributes :
+                job_id -> int : id of the job.
+                worker -> str : name of the worker holding the job.
+                seconds -> float : duration of the job.
+                error -> str : error of the job, None if it succeeded.
+        """
+        if error == None:
+            status = "'done'"
+        else:
+            status = "CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END"
+
+        parameters = ([] if error == None else [self.max_attempts]) + [error, seconds, time.time(), job_id, worker]
+        with closing(self.__connect()) as connection:
+            cursor = connection.execute(
+                f"UPDATE jobs SET status = {status}, error = ?, seconds = ?, updated = ?, lease_until = NULL WHERE id = ? AND worker = ? AND status = 'running'",
+                parameters
+            )
+            return cursor.rowcount == 1
+
+
+    def retry_failed(self):
+        """ Put every failed job back in the queue with all its attempts. Return the number of jobs. """
+        with closing(self.__connect()) as connection:
+            cursor = connection.execute(
+                "UPDATE jobs SET status = 'pending', attempts = 0, error = NULL, worker = NULL, updated = ? WHERE status = 'failed'",
+                (time.time(),)
+            )
+            return cursor.rowcount
+
+
+    def get_status(self):
+        """ Get the number of jobs by status, and the failed jobs with their error. """
+        with closing(self.__connect()) as connection:
+            counts = dict(connection.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+            failed = connection.execute(
+                "SELECT id, design_index, template_number, colors, attempts, error FROM jobs WHERE status = 'failed' ORDER BY id"
+            ).fetchall()
+
+        return {
+            "counts": {status: counts.get(status, 0) for status in self.STATUSES},
+            "failed": [
+                {"id": job_id, "index": index, "template_number": template_number, "colors": self.__split_colors(colors), "attempts": attempts, "error": error}
+                for job_id, index, template_number, colors, attempts, error in failed
+            ]
+        }
+
+
+    def __join_colors(self, colors:list):
+        """ Get the colors of a job as text, '' for a template (so the jobs stay unique). """
+        return "" if colors == None else ",".join(colors)
+
+
+    def __split_colors(self, colors:str):
+        """ Get the colors of a job from their text, None for a template. """
+        return None if colors == "" else colors.split(",")
+
+
+
+def get_worker_name():
+    """ Get a name of the current process unique across the machines sharing a queue. """
+    return f"{socket.gethostname()}-{os.getpid()}"
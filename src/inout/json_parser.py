@@ -1,104 +1,132 @@
 import json
+import os.path
+
+from inout.output_store import get_output_store
 
 class JSONInputParser:
-    """ Used to get data from the input JSON. """
+    """ Used to get data from the input JSON.
+        The file is parsed once and indexed by design index, then parsed again only when it changes.
+        A '.jsonl' file (one design per line) is only indexed by line position, each design is parsed when asked.
+    """
 
-    def __init__(self):
-        self.INPUT_PATH = "./data/input.json"
+    def __init__(self, input_path:str = "./data/input.json"):
+        """ Attributes :
+                input_path -> str : path of the input JSON (or JSON lines) file.
+        """
+        self.INPUT_PATH = input_path
+        self.IS_JSON_LINES = input_path.endswith(".jsonl")
 
-        with open(self.INPUT_PATH) as json_file:
-            self.DATA = json.load(json_file)
-        
+        self.__load()
 
-    def get_data(self, index:int):
-        """ Get data by index.
 
-            Attributes :
-                index -> int : index of the data to get.
-        """
-        for value in self.DATA:
-            if value['index'] == index:
-                return value
-    
-        # Raise an error if the data doesn't exist in the JSON.
-        raise Exception("There is no data for this index.")
+    def __load(self):
+        """ Parse the input file and index it by design index. """
+        self.modification_time = os.path.getmtime(self.INPUT_PATH)
 
+        if self.IS_JSON_LINES:
+            # Keep only the position of each line, the designs stay on the disk.
+            self.DATA = None
+            self.INDEX = {}
+            with open(self.INPUT_PATH, "rb") as json_file:
+                offset = json_file.tell()
+                for line in iter(json_file.readline, b""):
+                    if line.strip():
+                        self.INDEX[json.loads(line)['index']] = offset
+                    offset = json_file.tell()
+        else:
+            with open(self.INPUT_PATH) as json_file:
+                self.DATA = json.load(json_file)
+            self.INDEX = {value['index']: value for value in self.DATA}
 
 
-class JSONOutputParser:
-    """ Used to put data in the output JSON. """
+    def reload_if_changed(self):
+        """ Parse the input file again if it was modified since the last parse. """
+        if os.path.getmtime(self.INPUT_PATH) != self.modification_time:
+            self.__load()
 
-    def __init__(self, index:int):
-        """ Attributes :
-                index -> int : index of the data to put in the JSON (or edit).
-        """
-        self.OUTPUT_PATH = "./data/output.json"
-        self.INDEX = index
 
-        with open(self.OUTPUT_PATH) as json_file:
-            self.DATA = json.load(json_file)
+    def get_indexes(self):
+        """ Get every design index of the input, in the file order. """
+        self.reload_if_changed()
+        return list(self.INDEX.keys())
 
 
-    def add_font(self, font):
-        """ Add a font to the output. """
-        self.font = font
+    def iterate(self):
+        """ Iterate over every design of the input, reading a JSON lines file one line at a time. """
+        self.reload_if_changed()
 
+        if not self.IS_JSON_LINES:
+            yield from self.DATA
+            return
 
-    def add_list_fonts_index(self, list_fonts_index):
-        """ Add a list of font index to the output. """
-        self.list_fonts_index = list_fonts_index
+        with open(self.INPUT_PATH, "rb") as json_file:
+            for line in json_file:
+                if line.strip():
+                    yield json.loads(line)
 
 
-    def add_type_writing(self, type_writing):
-        """ Set the type writing to the output. """
-        self.type_writing = type_writing
+    def get_data(self, index:int):
+        """ Get data by index.
 
+            Attributes :
+                index -> int : index of the data to get.
+        """
+        self.reload_if_changed()
+
+        # Raise an error if the data doesn't exist in the JSON.
+        if index not in self.INDEX:
+            raise Exception("There is no data for this index.")
 
-    def add_description(self, title, description):
-        """ Add a title and a description to the design. """
-        self.title = title
-        self.description = description
+        if not self.IS_JSON_LINES:
+            return self.INDEX[index]
 
-    
-    def save(self):
-        """ Save the design to the JSON output file. """
-        data = {
-            "index": self.INDEX,
-            "title": self.title,
-            "description": self.description,
-            "font": self.font,
-            "list_fonts_index": self.list_fonts_index,
-            "type_writing": self.type_writing
-        }
+        with open(self.INPUT_PATH, "rb") as json_file:
+            json_file.seek(self.INDEX[index])
+            return json.loads(json_file.readline())
 
-        # Append the new data to the current data.
-        with open(self.OUTPUT_PATH) as json_file:
-            current_data = json.load(json_file)
-        self.__remove_if_exists(current_data)
-        current_data.append(data)
 
-        # Write every data to the file.
-        with open(self.OUTPUT_PATH, "w") as json_file:
-            json_file.write(json.dumps(current_data, indent=4))
+# Input parsers shared by the whole process, by path.
+INPUT_PARSERS = {}
 
+def get_input_parser(input_path:str = "./data/input.json"):
+    """ Get the input parser of the process for a file, created only once.
 
-    def __remove_if_exists(self, data:list):
-        """ Remove the data if it already exists. 
-        
-            Attributes :
-                data -> list : JSON data list.
+        Attributes :
+            input_path -> str : path of the input JSON (or JSON lines) file.
+    """
+    if input_path not in INPUT_PARSERS:
+        INPUT_PARSERS[input_path] = JSONInputParser(input_path)
+    return INPUT_PARSERS[input_path]
+
+
+
+class JSONOutputParser:
+    """ Used to read a saved design from the output store, and to update it.
+        The templates being created are kept as TemplateResult (see 'inout.template_result').
+    """
+
+    def __init__(self, index:int, output_store:object = None):
+        """ Attributes :
+                index -> int : index of the saved design.
+                output_store -> object : store of the saved designs, the one shared by the process by default.
         """
-        for value in data:
-            if value["index"] == self.INDEX:
-                data.remove(value)
-                return
+        self.INDEX = index
+        self.OUTPUT_STORE = output_store or get_output_store()
+
+
+    def save_layout(self, layout):
+        """ Save the layout plan of an already saved design. """
+        data = self.get_data()
+        data["layout"] = layout
+
+        self.OUTPUT_STORE.upsert(data)
 
 
     def get_data(self):
         """ Get data associated with the index. """
-        for value in self.DATA:
-            if value['index'] == self.INDEX:
-                return value
-    
-        # Raise an error if the data doesn't exist in the JSON.
-        raise Exception("There is no data for this index.")
\ No newline at end of file
+        data = self.OUTPUT_STORE.get(self.INDEX)
+
+        # Raise an error if the data doesn't exist in the output.
+        if data == None:
+            raise Exception("There is no data for this index.")
+        return data
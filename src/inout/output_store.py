@@ -0,0 +1,193 @@
+import json
+import os
+import os.path
+import sqlite3
+import threading
+
+class SQLiteOutputStore:
+    """ Used to keep the saved designs in a SQLite database, one row by design index.
+        Every save is an atomic upsert, and many processes can save at the same time.
+        Each process opens its own connection once (a connection can't be used after a fork), shared by its threads.
+        The database uses a rollback journal, so the job queue workers of several machines can save through a shared folder
+        (the WAL mode keeps its index in shared memory, so it only works on one machine).
+    """
+
+    def __init__(self, database_path:str = "./data/output.sqlite", legacy_json_path:str = "./data/output.json"):
+        """ Attributes :
+                database_path -> str : path of the SQLite database.
+                legacy_json_path -> str : old output JSON, imported once in the database (None to not import it).
+        """
+        self.DATABASE_PATH = database_path
+        self.LEGACY_JSON_PATH = legacy_json_path
+
+        # Connection of each process by pid, the ones inherited through a fork are kept but never used.
+        self.__connections = {}
+        self.__lock = threading.Lock()
+
+        with self.__lock:
+            connection = self.__get_connection()
+            # The journal mode is kept in the database file, it only has to be set once (a database made in WAL mode is converted back).
+            connection.execute("PRAGMA journal_mode=DELETE")
+            with connection:
+                connection.execute("CREATE TABLE IF NOT EXISTS designs (design_index INTEGER PRIMARY KEY, data TEXT NOT NULL)")
+                connection.execute("CREATE TABLE IF NOT EXISTS metadata (key TEXT PRIMARY KEY, value TEXT)")
+
+            self.__migrate_legacy_json(connection)
+
+
+    def __get_connection(self):
+        """ Get the connection of the current process to the database (to use with the lock), opened the first time.
+            It waits for the other writers instead of failing.
+        """
+        pid = os.getpid()
+        if pid not in self.__connections:
+            connection = sqlite3.connect(self.DATABASE_PATH, timeout=60, isolation_level=None, check_same_thread=False)
+            connection.execute("PRAGMA busy_timeout=60000")
+            self.__connections[pid] = connection
+        return self.__connections[pid]
+
+
+    def __migrate_legacy_json(self, connection:object):
+        """ Import the old output JSON the first time the database is used.
+            The JSON file isn't read afterwards, a message says it once, and again each time the file changes.
+
+            Attributes :
+                connection -> object : open SQLite connection.
+        """
+        if self.LEGACY_JSON_PATH == None or not os.path.isfile(self.LEGACY_JSON_PATH):
+            return
+
+        stat = os.stat(self.LEGACY_JSON_PATH)
+        legacy_json_stat = f"{stat.st_mtime_ns}:{stat.st_size}"
+        message = None
+
+        # Lock the database so only one process does the migration.
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            already_done = connection.execute("SELECT 1 FROM metadata WHERE key = 'legacy_json_migrated'").fetchone()
+            known_stat = connection.execute("SELECT value FROM metadata WHERE key = 'legacy_json_stat'").fetchone()
+
+            if not already_done:
+                with open(self.LEGACY_JSON_PATH) as json_file:
+                    legacy_data = json.load(json_file)
+
+                # Keep the designs already saved in the database.
+                connection.executemany(
+                    "INSERT OR IGNORE INTO designs (design_index, data) VALUES (?, ?)",
+                    [(value['index'], json.dumps(value)) for value in legacy_data]
+                )
+                connection.execute("INSERT INTO metadata (key, value) VALUES ('legacy_json_migrated', ?)", (self.LEGACY_JSON_PATH,))
+
+            if not already_done or known_stat == None:
+                message = f"The designs of '{self.LEGACY_JSON_PATH}' are saved in '{self.DATABASE_PATH}', the JSON file isn't read anymore (it can be removed)."
+            elif known_stat[0] != legacy_json_stat:
+                message = f"'{self.LEGACY_JSON_PATH}' changed but it isn't read anymore, the designs are saved in '{self.DATABASE_PATH}'."
+
+            if message != None:
+                connection.execute("INSERT OR REPLACE INTO metadata (key, value) VALUES ('legacy_json_stat', ?)", (legacy_json_stat,))
+            connection.execute("COMMIT")
+        except Exception:
+            connection.execute("ROLLBACK")
+            raise
+
+        if message != None:
+            print(message)
+
+
+    def get(self, index:int):
+        """ Get the saved design of an index, or None if there is none.
+
+            Attributes :
+                index -> int : index of the design.
+        """
+        with self.__lock:
+            row = self.__get_connection().execute("SELECT data FROM designs WHERE design_index = ?", (index,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+
+    def get_all(self):
+        """ Get every saved design, sorted by index. """
+        with self.__lock:
+            rows = self.__get_connection().execute("SELECT data FROM designs ORDER BY design_index").fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+
+    def upsert(self, data:dict):
+        """ Save a design, replacing the one with the same index.
+
+            Attributes :
+                data -> dict : design to save, with its 'index'.
+        """
+        with self.__lock:
+            self.__get_connection().execute(
+                "INSERT INTO designs (design_index, data) VALUES (?, ?) ON CONFLICT(design_index) DO UPDATE SET data = excluded.data",
+                (data['index'], json.dumps(data))
+            )
+
+
+
+class JSONOutputStore:
+    """ Used to keep the saved designs in the old output JSON file.
+        Every save rewrites the whole file (atomically), so it is only meant for small outputs and a single writer.
+    """
+
+    def __init__(self, output_path:str = "./data/output.json"):
+        """ Attributes :
+                output_path -> str : path of the output JSON.
+        """
+        self.OUTPUT_PATH = output_path
+
+
+    def get(self, index:int):
+        """ Get the saved design of an index, or None if there is none.
+
+            Attributes :
+                index -> int : index of the design.
+        """
+        for value in self.get_all():
+            if value['index'] == index:
+                return value
+        return None
+
+
+    def get_all(self):
+        """ Get every saved design. """
+        if not os.path.isfile(self.OUTPUT_PATH):
+            return []
+
+        with open(self.OUTPUT_PATH) as json_file:
+            return json.load(json_file)
+
+
+    def upsert(self, data:dict):
+        """ Save a design, replacing the one with the same index.
+
+            Attributes :
+                data -> dict : design to save, with its 'index'.
+        """
+        current_data = [value for value in self.get_all() if value['index'] != data['index']]
+        current_data.append(data)
+
+        # Write to a temporary file first so the output is never partially written.
+        tmp_path = f"{self.OUTPUT_PATH}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as json_file:
+            json_file.write(json.dumps(current_data, indent=4))
+        os.replace(tmp_path, self.OUTPUT_PATH)
+
+
+
+# Output stores shared by the whole process, by path.
+OUTPUT_STORES = {}
+
+def get_output_store(output_path:str = "./data/output.sqlite"):
+    """ Get the output store of the process for a path, the kind of store depends on its extension.
+
+        Attributes :
+            output_path -> str : '.sqlite' database (old output JSON imported once) or '.json' file.
+    """
+    if output_path not in OUTPUT_STORES:
+        if output_path.endswith(".json"):
+            OUTPUT_STORES[output_path] = JSONOutputStore(output_path)
+        else:
+            OUTPUT_STORES[output_path] = SQLiteOutputStore(output_path, os.path.splitext(output_path)[0] + ".json")
+    return OUTPUT_STORES[output_path]
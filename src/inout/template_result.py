@@ -0,0 +1,52 @@
+from inout.output_store import get_output_store
+
+class TemplateResult:
+    """ Used to keep the parameters of one built template, small enough to keep hundreds of them and send them between processes.
+        Only the kept template is saved, through the output store shared by the process.
+    """
+
+    __slots__ = ("index", "file_path", "font", "list_fonts_index", "type_writing", "title", "description", "layout")
+
+    def __init__(self, index:int, file_path:str, font:str, list_fonts_index:list, type_writing:bool, title:str, description:str, layout:dict = None):
+        """ Attributes :
+                index -> int : index of the design.
+                file_path -> str : path of the image of the template.
+                font -> str : font family of the text.
+                list_fonts_index -> list : weight of each line (0 regular, 1 light).
+                type_writing -> bool : is the last line written at the bottom.
+                title -> str : title of the design.
+                description -> str : description of the design.
+                layout -> dict : layout plan of the template, None for a preview.
+        """
+        self.index = index
+        self.file_path = file_path
+        self.font = font
+        self.list_fonts_index = list_fonts_index
+        self.type_writing = type_writing
+        self.title = title
+        self.description = description
+        self.layout = layout
+
+
+    def to_dict(self):
+        """ Get the design as it is saved in the output store. """
+        data = {
+            "index": self.index,
+            "title": self.title,
+            "description": self.description,
+            "font": self.font,
+            "list_fonts_index": self.list_fonts_index,
+            "type_writing": self.type_writing
+        }
+        if self.layout != None:
+            data["layout"] = self.layout
+        return data
+
+
+    def save(self, output_store:object = None):
+        """ Save the design to the output store, replacing the old one.
+
+            Attributes :
+                output_store -> object : store of the saved designs, the one shared by the process by default.
+        """
+        (output_store or get_output_store()).upsert(self.to_dict())
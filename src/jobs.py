@@ -0,0 +1,169 @@
+from inout.job_queue import JobQueue, get_worker_name
+from inout.json_parser import get_input_parser
+from design.image_writer import ImageWriter, parse_compression
+
+import batch
+
+from multiprocessing import Process
+import argparse
+import threading
+import time
+
+import printer as pr
+
+
+def main():
+    """ Manage the durable job queue : add jobs, run workers, follow the run and retry the failed jobs. """
+    args = parse_arguments()
+    args.function(args)
+
+
+def parse_arguments():
+    """ Parse the command line arguments. """
+    parser = argparse.ArgumentParser(description="Run the generation of the designs through a durable job queue.")
+    parser.add_argument("--queue", default="./data/jobs.sqlite", help="path of the SQLite job queue.")
+    parser.add_argument("--max-attempts", type=int, default=3, help="number of times a job is tried before it is failed.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    enqueue_parser = commands.add_parser("enqueue", help="add the jobs of some designs to the queue.")
+    enqueue_parser.add_argument("--indexes", default="all", help="'all' or design indexes and ranges, ex: '1-3,7'.")
+    enqueue_parser.add_argument("--mode", choices=["create", "recreate"], default="recreate",
+                                help="'create' makes templates in images/waiting, 'recreate' makes the saved designs in images/output.")
+    enqueue_parser.add_argument("--templates", type=int, default=1, help="number of templates per design in 'create' mode.")
+    enqueue_parser.add_argument("--preview-scale", type=float, default=1, help="scale of the templates in 'create' mode.")
+    enqueue_parser.add_argument("--colors", default="white,black", help="colors of the designs in 'recreate' mode, separated by commas.")
+    enqueue_parser.add_argument("--input", default="./data/input.json", help="path of the input catalog.")
+    enqueue_parser.add_argument("--requeue", action="store_true",
+                                help="queue again the jobs already in the queue (done, failed or pending with another preview scale), not the running ones.")
+    enqueue_parser.set_defaults(function=enqueue)
+
+    work_parser = commands.add_parser("work", help="run worker processes until the queue is empty.")
+    work_parser.add_argument("--workers", type=int, default=1, help="number of worker processes on this machine.")
+    work_parser.add_argument("--lease", type=float, default=600, help="seconds a job is kept without news of its worker before another one takes it.")
+    work_parser.add_argument("--wait", action="store_true", help="keep waiting for new jobs instead of stopping when the queue is empty.")
+    work_parser.add_argument("--input", default="./data/input.json", help="path of the input catalog.")
+    work_parser.add_argument("--format", choices=ImageWriter.FORMATS, default="png", help="format of the images ('webp' images are lossless).")
+    work_parser.add_argument("--waiting-compression", type=parse_compression, default="fast",
+                             help="PNG compression of the templates : 'fast', 'best' or a level from 0 to 9.")
+    work_parser.add_argument("--output-compression", type=parse_compression, default="best",
+                             help="PNG compression of the saved designs : 'fast', 'best' or a level from 0 to 9.")
+    work_parser.set_defaults(function=work)
+
+    status_parser = commands.add_parser("status", help="show the number of jobs by status and the failed jobs.")
+    status_parser.set_defaults(function=status)
+
+    retry_parser = commands.add_parser("retry", help="put the failed jobs back in the queue.")
+    retry_parser.set_defaults(function=retry)
+
+    return parser.parse_args()
+
+
+def enqueue(args:object):
+    """ Add the jobs of the asked designs to the queue. """
+    input_parser = get_input_parser(args.input)
+    indexes = batch.parse_indexes(args.indexes, input_parser.get_indexes())
+    jobs = batch.list_jobs(indexes, args.mode, args.templates, args.colors.split(","))
+
+    added_jobs, requeued_jobs = JobQueue(args.queue, args.max_attempts).enqueue(jobs, args.preview_scale, args.requeue)
+    ignored_jobs = len(jobs) - added_jobs - requeued_jobs
+
+    print(f"{added_jobs} jobs added, {requeued_jobs} jobs queued again.")
+    if ignored_jobs:
+        reason = "running" if args.requeue else "already in the queue, use --requeue to queue them again"
+        print(f"{ignored_jobs} jobs ignored ({reason}).")
+
+
+def work(args:object):
+    """ Run worker processes on the queue and wait for them. """
+    JobQueue(args.queue, args.max_attempts)
+    print("\n-------- " + pr.bold_print(f"STARTING {args.workers} WORKERS") + " --------")
+
+    image_options = {"image_format": args.format, "waiting_compression": args.waiting_compression, "output_compression": args.output_compression}
+    workers = [
+        Process(target=run_worker, args=(args.queue, args.max_attempts, args.input, args.lease, args.wait, image_options))
+        for _ in range(args.workers)
+    ]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    status(args)
+
+
+def run_worker(queue_path:str, max_attempts:int, input_path:str, lease_seconds:float, wait:bool, image_options:dict = None):
+    """ Claim and run jobs until the queue is empty, in a worker process.
+
+        Attributes :
+            queue_path -> str : path of the SQLite job queue.
+            max_attempts -> int : number of times a job is tried before it is failed.
+            input_path -> str : path of the input catalog.
+            lease_seconds -> float : seconds a job is kept without renewing its lease.
+            wait -> bool : keep waiting for new jobs when the queue is empty.
+            image_options -> dict : 'image_format', 'waiting_compression' and 'output_compression' of the images (see batch.run_job), the defaults if None.
+    """
+    if image_options == None:
+        image_options = {}
+    queue = JobQueue(queue_path, max_attempts)
+    batch.init_worker(get_input_parser(input_path))
+    worker = get_worker_name()
+
+    while True:
+        job = queue.claim(worker, lease_seconds)
+        if job == None:
+            if not wait:
+                for name, stats in batch.get_cache_stats().items():
+                    print(f"- Worker {worker}, {name} : {stats['hits']} hits, {stats['misses']} misses ({round(stats['hit_rate'] * 100, 1)}% hit rate)")
+                return
+            time.sleep(5)
+            continue
+
+        # Renew the lease while the job runs, so it is only taken again if this process dies.
+        is_finished = threading.Event()
+        heartbeat = threading.Thread(target=renew_lease, args=(queue, job["id"], worker, lease_seconds, is_finished), daemon=True)
+        heartbeat.start()
+
+        try:
+            result = batch.run_job(job["index"], job["template_number"], job["colors"], job["preview_scale"], **image_options)
+        finally:
+            is_finished.set()
+            heartbeat.join()
+
+        queue.finish(job["id"], worker, result["seconds"], result["error"])
+
+        job_status = pr.green_print("[FINISHED]") if result["error"] == None else pr.bold_print("[FAILED] " + result["error"])
+        print(f"+ Job {job['id']} (design {job['index']} / {job['template_number']} / {job['colors']}, attempt {job['attempt']}) : {job_status}")
+
+
+def renew_lease(queue:object, job_id:int, worker:str, lease_seconds:float, is_finished:object):
+    """ Renew the lease of a job every third of the lease until the job is finished.
+
+        Attributes :
+            queue -> object : JobQueue of the job.
+            job_id -> int : id of the job.
+            worker -> str : name of the worker holding the job.
+            lease_seconds -> float : seconds of each lease.
+            is_finished -> object : threading.Event set when the job is finished.
+    """
+    while not is_finished.wait(lease_seconds / 3):
+        if not queue.renew(job_id, worker, lease_seconds):
+            return
+
+
+def status(args:object):
+    """ Print the number of jobs by status and the failed jobs. """
+    queue_status = JobQueue(args.queue, args.max_attempts).get_status()
+
+    print(" / ".join(f"{name} : {count}" for name, count in queue_status["counts"].items()))
+    for job in queue_status["failed"]:
+        print(f"- Job {job['id']} (design {job['index']} / {job['template_number']} / {job['colors']}, {job['attempts']} attempts) : {job['error']}")
+
+
+def retry(args:object):
+    """ Put the failed jobs back in the queue. """
+    retried_jobs = JobQueue(args.queue, args.max_attempts).retry_failed()
+    print(f"{retried_jobs} failed jobs put back in the queue.")
+
+
+if __name__ == '__main__':
+    main()
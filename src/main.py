@@ -1,14 +1,21 @@
-from design.svg_editor import SVGEditor
-from design.place_finder import PlaceFinder
-from design.design_handler import DesignHandler
-
-from inout.json_parser import JSONOutputParser
-
+from concurrent.futures import ProcessPoolExecutor, as_completed
 import os
+import random
 import time
 
 import printer as pr
 
+# The design pipeline (NumPy, OpenCV, Pillow...) is only imported by the functions building the designs,
+# so the questions are asked at once and each worker process only loads it when it gets its first template.
+
+# Scale of the templates to choose from, only the kept one is re-created at full size.
+PREVIEW_SCALE = 0.25
+
+# Format of the images, and PNG compression of the templates and of the re-created designs ('fast', 'best' or a level from 0 to 9).
+IMAGE_FORMAT = "png"
+WAITING_COMPRESSION = "fast"
+OUTPUT_COMPRESSION = "best"
+
 def main():
     # What do you want to do ?
     what_to_do = input("Creating or re-creating ? ")
@@ -21,12 +28,15 @@ def main():
     
     # Clear everyhting we have created.
     clear_waiting_folder()
-    os.remove("pywhatkit_dbs.txt") # Bug of 'import'.
 
 
-def create():
-    """ Create a design. """
-    list_of_results = []
+def create(number_of_workers:int = None, preview_scale:float = PREVIEW_SCALE):
+    """ Create a design.
+
+        Attributes :
+            number_of_workers -> int : number of processes building the templates (one per core by default).
+            preview_scale -> float : scale of the templates to choose from (1 for full size templates).
+    """
     start_time = time.time()
 
     # Creation questions.
@@ -35,15 +45,20 @@ def create():
 
     print("\n-------- " + pr.bold_print("STARTING CREATION") + " --------")
 
-    # Generate the templates.
-    for i in range(number_of_templates):
-        print(f"- Template {i} : {pr.blue_print('[STARTED]')}")
-        creator = DesignHandler(index, template_number=i)
-        result = creator.build()
+    # Generate the templates, each one in the first free process.
+    list_of_results = [None] * number_of_templates
+    with ProcessPoolExecutor(max_workers=number_of_workers or os.cpu_count()) as executor:
+        futures = {}
+        for i in range(number_of_templates):
+            print(f"- Template {i} : {pr.blue_print('[STARTED]')}")
+            futures[executor.submit(build_template, index, i, preview_scale)] = i
+
+        for finished, future in enumerate(as_completed(futures)):
+            i = futures[future]
+            list_of_results[i] = future.result()
 
-        list_of_results.append(result)
-        load_process = int((i + 1) / number_of_templates * 100)
-        print(f"+ Template {i} : " + pr.green_print('[FINISHED - ' + str(load_process) + "%]"))
+            load_process = int((finished + 1) / number_of_templates * 100)
+            print(f"+ Template {i} : " + pr.green_print('[FINISHED - ' + str(load_process) + "%]"))
 
     end_time = time.time()
     timer = format_time(start_time, end_time)
@@ -65,13 +80,50 @@ def create():
         recreate(index)
 
 
-def recreate(index):
-    """ Re-create a design. """
-    for color in ["white", "black"]:
-        print(f"- Recreating {color} design : {pr.blue_print('[STARTED]')}")
-        creator = DesignHandler(index, is_recreating=True, color=color)
-        creator.build()
-        print(f"+ Recreating {color} design : {pr.green_print('[FINISHED]')}")
+def build_template(index:int, template_number:int, preview_scale:float = 1, image_format:str = IMAGE_FORMAT, waiting_compression = WAITING_COMPRESSION):
+    """ Build one template, in a worker process. Return its TemplateResult, only saved if the template is kept.
+
+        Attributes :
+            index -> int : index of the design to create.
+            template_number -> int : number of the template to create.
+            preview_scale -> float : scale of the template.
+            image_format -> str : format of the template image.
+            waiting_compression -> str/int : PNG compression of the template.
+    """
+    # Forked processes share the random state of the parent, so give each template its own.
+    random.seed()
+
+    from design.design_handler import DesignHandler
+    from design.image_writer import IMAGE_WRITER
+    creator = DesignHandler(index, template_number=template_number, preview_scale=preview_scale, image_format=image_format, waiting_compression=waiting_compression)
+    try:
+        result = creator.build()
+    finally:
+        # The template is shown once the worker returns, so it has to be written.
+        # A failed template waits for its writes too, so they never go to the next template of the worker.
+        IMAGE_WRITER.flush()
+    return result
+
+
+def recreate(index, colors:tuple = ("white", "black"), image_format:str = IMAGE_FORMAT, output_compression = OUTPUT_COMPRESSION):
+    """ Re-create a design in every color, from one layout.
+
+        Attributes :
+            index -> int : index of the design to re-create.
+            colors -> tuple : colors of the designs.
+            image_format -> str : format of the designs.
+            output_compression -> str/int : PNG compression of the designs.
+    """
+    from design.design_handler import DesignHandler
+    from design.image_writer import IMAGE_WRITER
+
+    print(f"- Recreating {', '.join(colors)} designs : {pr.blue_print('[STARTED]')}")
+    creator = DesignHandler(index, is_recreating=True, image_format=image_format, output_compression=output_compression)
+    try:
+        creator.build_colorways(colors)
+    finally:
+        IMAGE_WRITER.flush()
+    print(f"+ Recreating {', '.join(colors)} designs : {pr.green_print('[FINISHED]')}")
 
 
 def clear_waiting_folder():
@@ -0,0 +1,112 @@
+from collections import OrderedDict
+import io
+
+from PIL import ImageFont
+
+class FontCache:
+    """ Used to share the loaded fonts between every text creation of the process. """
+
+    def __init__(self, max_size:int = 256, font_folder:str = "./fonts/"):
+        """ Attributes :
+                max_size -> int : maximum number of fonts kept in memory.
+                font_folder -> str : folder containing a sub-folder for each font family.
+        """
+        self.FONT_FOLDER = font_folder
+        self.max_size = max_size
+
+        self.hits = 0
+        self.misses = 0
+        self.file_loads = 0
+
+        self.__fonts = OrderedDict()
+        self.__font_files = {}
+
+
+    def get_font(self, family:str, weight:str, size:int):
+        """ Get a font, loading it only if it is not already in the cache.
+
+            Attributes :
+                family -> str : name of the font family (ex: 'roboto').
+                weight -> str : weight of the font ('regular', 'light' or 'bold').
+                size -> int : size of the font.
+        """
+        key = family, weight, size
+
+        font = self.__fonts.get(key)
+        if font != None:
+            self.hits += 1
+            self.__fonts.move_to_end(key)
+            return font
+
+        self.misses += 1
+        font = ImageFont.truetype(io.BytesIO(self.__get_font_file(family, weight)), size)
+        self.__fonts[key] = font
+
+        # Remove the least recently used fonts.
+        while len(self.__fonts) > self.max_size:
+            self.__fonts.popitem(last=False)
+
+        return font
+
+
+    def get_font_path(self, family:str, weight:str):
+        """ Get the path of a font file.
+
+            Attributes :
+                family -> str : name of the font family.
+                weight -> str : weight of the font.
+        """
+        return f"{self.FONT_FOLDER}{family}/{family}-{weight}.ttf"
+
+
+    def __get_font_file(self, family:str, weight:str):
+        """ Get the content of a font file, read from the disk only once.
+
+            Attributes :
+                family -> str : name of the font family.
+                weight -> str : weight of the font.
+        """
+        key = family, weight
+
+        if key not in self.__font_files:
+            with open(self.get_font_path(family, weight), "rb") as font_file:
+                self.__font_files[key] = font_file.read()
+            self.file_loads += 1
+
+        return self.__font_files[key]
+
+
+    def set_max_size(self, max_size:int):
+        """ Change the maximum number of fonts kept in memory.
+
+            Attributes :
+                max_size -> int : maximum number of fonts kept in memory.
+        """
+        self.max_size = max_size
+
+        while len(self.__fonts) > self.max_size:
+            self.__fonts.popitem(last=False)
+
+
+    def get_stats(self):
+        """ Get the usage counters of the cache. """
+        requests = self.hits + self.misses
+        return {
+            "size": len(self.__fonts),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / requests if requests else 0.0,
+            "file_loads": self.file_loads
+        }
+
+
+    def clear(self):
+        """ Remove every font and reset the counters. """
+        self.__fonts.clear()
+        self.__font_files.clear()
+        self.hits, self.misses, self.file_loads = 0, 0, 0
+
+
+# Cache shared by every TextCreator of the process.
+FONT_CACHE = FontCache()
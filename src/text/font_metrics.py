@@ -0,0 +1,125 @@
+import json
+import os
+import os.path
+
+from PIL import ImageFont
+
+class FontMetrics:
+    """ Used to measure a text at any font size with the precomputed metrics of a font file. """
+
+    # Size at which the metrics are measured, the values are then expressed in 1/1000 em.
+    UNITS_PER_EM = 1000
+    CHARACTERS = "".join(chr(i) for i in range(32, 127)) + "".join(chr(i) for i in range(160, 256))
+    KERNING_CHARACTERS = "".join(chr(i) for i in range(32, 127))
+
+    def __init__(self, font_path:str):
+        """ Attributes :
+                font_path -> str : path of the TTF font file.
+        """
+        self.FONT_PATH = font_path
+        self.METRICS_PATH = os.path.splitext(font_path)[0] + ".metrics.json"
+
+        if self.__is_index_outdated():
+            self.__build_index()
+            self.__save_index()
+        else:
+            self.__load_index()
+
+
+    def __is_index_outdated(self):
+        """ See if the metrics index has to be built again. """
+        if not os.path.isfile(self.METRICS_PATH):
+            return True
+        return os.path.getmtime(self.METRICS_PATH) < os.path.getmtime(self.FONT_PATH)
+
+
+    def __build_index(self):
+        """ Measure the advance of each character, the kerning of each pair and the vertical metrics. """
+        font = ImageFont.truetype(self.FONT_PATH, self.UNITS_PER_EM)
+
+        self.advances = {character: font.getlength(character) for character in self.CHARACTERS}
+
+        # Only keep the pairs that have a kerning.
+        self.kerning = {}
+        for first in self.KERNING_CHARACTERS:
+            for second in self.KERNING_CHARACTERS:
+                kerning = font.getlength(first + second) - self.advances[first] - self.advances[second]
+                if kerning != 0:
+                    self.kerning[first + second] = kerning
+
+        self.ascent, self.descent = font.getmetrics()
+
+
+    def __save_index(self):
+        """ Save the metrics index next to the font file. """
+        data = {
+            "units_per_em": self.UNITS_PER_EM,
+            "advances": self.advances,
+            "kerning": self.kerning,
+            "ascent": self.ascent,
+            "descent": self.descent
+        }
+
+        # Write to a temporary file first so a concurrent reader never sees a partial index.
+        tmp_path = f"{self.METRICS_PATH}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, "w") as json_file:
+                json_file.write(json.dumps(data))
+            os.replace(tmp_path, self.METRICS_PATH)
+        except OSError:
+            # The font folder can be read-only, the index built in memory is then used without being saved.
+            if os.path.isfile(tmp_path):
+                os.remove(tmp_path)
+
+
+    def __load_index(self):
+        """ Load the metrics index saved next to the font file. """
+        with open(self.METRICS_PATH) as json_file:
+            data = json.load(json_file)
+
+        self.advances = data['advances']
+        self.kerning = data['kerning']
+        self.ascent, self.descent = data['ascent'], data['descent']
+
+
+    def get_width(self, text:str, font_size:float = UNITS_PER_EM):
+        """ Get the width of a text, or None if a character is not in the index.
+
+            Attributes :
+                text -> str : text to measure.
+                font_size -> float : size of the font.
+        """
+        width = 0
+        for index, character in enumerate(text):
+            advance = self.advances.get(character)
+            if advance == None:
+                return None
+
+            width += advance
+            if index > 0:
+                width += self.kerning.get(text[index - 1:index + 1], 0)
+
+        return width * font_size / self.UNITS_PER_EM
+
+
+    def get_height(self, font_size:float):
+        """ Get the height of a line (ascent + descent) for a font size.
+
+            Attributes :
+                font_size -> float : size of the font.
+        """
+        return (self.ascent + self.descent) * font_size / self.UNITS_PER_EM
+
+
+# Metrics loaded by the process, by font file.
+LOADED_METRICS = {}
+
+def get_font_metrics(font_path:str):
+    """ Get the metrics of a font file, loaded (or built) only once per process.
+
+        Attributes :
+            font_path -> str : path of the TTF font file.
+    """
+    if font_path not in LOADED_METRICS:
+        LOADED_METRICS[font_path] = FontMetrics(font_path)
+    return LOADED_METRICS[font_path]
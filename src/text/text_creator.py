@@ -1,14 +1,19 @@
 import os
+import math
 import random
 
-from PIL import Image, ImageFont, ImageDraw
+from PIL import Image, ImageDraw
 import numpy as np
-import cv2
+
+from text.font_cache import FONT_CACHE
+from text.font_metrics import get_font_metrics
+
+from tracer import TRACER
 
 class TextCreator:
     """ Used to create and place the text on an image. """
 
-    def __init__(self, words:list, keywords:list, output_image:object, color:str, keyword_font_color:str, output_data:object = None):
+    def __init__(self, words:list, keywords:list, output_image:object, color:str, keyword_font_color:str, output_data:object = None, scale:float = 1):
         """ Attributes : 
                 words -> list : list of words to write on the image.
                 keywords -> list : list of keywords to write differently on the image.
@@ -16,6 +21,7 @@ class TextCreator:
                 color -> str : color of the design.
                 keyword_font_color -> str : color to apply to the keyword.
                 output_data -> object : output data, used to recreate a design.
+                scale -> float : scale of the image compared to the full size design (ex: 0.25 for a preview).
         """
         self.FONT_FOLDER = "./fonts/"
         self.USED_FONT = self.__choose_random_font() if output_data == None else output_data['font']
@@ -28,6 +34,8 @@ class TextCreator:
         self.text_positions = []
 
         self.FONT_PADDING_TOP_RATIO = 6
+        self.MIN_FONT_SIZE = max(1, round(50 * scale))
+        self.MARGIN = round(20 * scale)
         self.output_data = output_data
         self.CURRENT_LIST_FONTS_INDEX = []
 
@@ -47,18 +55,39 @@ class TextCreator:
         return font
 
 
-    def write_text(self, type_writing:bool):
+    def write_text(self, type_writing:bool, lines:list = None):
         """ Write the text on the image. 
+            Every line is laid out first, then drawn on one PIL image converted back to OpenCV only once.
         
             Attributes :
                 type_writing -> bool : does we write everything on top or put the design in the middle.
+                lines -> list : lines already laid out (ex: from a saved layout plan), they are laid out by default.
         """
-        x, y = 0, 0
+        if lines == None:
+            lines = self.layout_text(type_writing)
+        else:
+            self.text_positions = [tuple(line['box']) for line in lines]
+        self.lines = lines
 
-        # Make into PIL Image.
+        # Make into PIL Image, draw every line and go back to an OpenCV image.
         image_pil = Image.fromarray(self.output_image)
+        self.draw_text(image_pil, lines)
+        image = np.array(image_pil)
+
+        return image, self.text_positions
+
+
+    def layout_text(self, type_writing:bool):
+        """ Choose the font, the size and the position of each line, without drawing anything.
+            Return the list of lines, each one a dict with its position, font size, segments and text box.
 
-        # Write each word.
+            Attributes :
+                type_writing -> bool : does we write everything on top or put the design in the middle.
+        """
+        x, y = 0, 0
+        lines = []
+
+        # Place each word.
         for index, word in enumerate(self.words):
             self.current_word_index = index
 
@@ -71,71 +100,193 @@ class TextCreator:
                 if keyword in word:
                     current_keyword = keyword
 
-            # Write the text on the image.
+            # Place the text on the image.
             if current_keyword == None:
-                image, x, y, text_width, text_height = self.__write_text_without_keyword(word, image_pil, self.text_color, pos)
+                line = self.__layout_text_without_keyword(word, pos)
             else:
-                image, x, y, text_width, text_height = self.__write_text_with_keyword(word, current_keyword, image_pil, self.text_color, pos)
+                line = self.__layout_text_with_keyword(word, current_keyword, pos)
 
-            self.text_positions.append((x, y, text_width, text_height))
+            lines.append(line)
+            x, y, text_width, text_height = line['box']
+            self.text_positions.append(line['box'])
             y += text_height
 
-        return image, self.text_positions
+        return lines
+
+
+    def draw_text(self, image_pil:object, lines:list):
+        """ Draw laid out lines on a PIL image.
+
+            Attributes :
+                image_pil -> object : PIL image.
+                lines -> list : lines returned by 'layout_text'.
+        """
+        draw = ImageDraw.Draw(image_pil)
+
+        for line in lines:
+            for segment in line['segments']:
+                font = self.__get_font(segment['weight'], line['font_size'])
+                position = line['x'] + segment['x_offset'], line['y']
+
+                if segment['is_keyword']:
+                    draw.text(position, segment['text'], self.keyword_font_color, font, stroke_fill=self.text_color, stroke_width=line['stroke_width'])
+                else:
+                    draw.text(position, segment['text'], self.text_color, font)
+
+
+    def draw_text_masks(self, lines:list):
+        """ Draw laid out lines as coverage masks, to color them afterwards in any color.
+            Return a 3-tuple of uint8 arrays, to blend in this order : the text mask and the keywords outline mask
+            (both in the text color), then the keywords mask (in the keyword color).
+
+            Attributes :
+                lines -> list : lines returned by 'layout_text'.
+        """
+        size = self.output_image.shape[1], self.output_image.shape[0]
+        masks = [Image.new("L", size, 0) for _ in range(3)]
+        text_draw, outline_draw, keyword_draw = [ImageDraw.Draw(mask) for mask in masks]
+
+        for line in lines:
+            for segment in line['segments']:
+                font = self.__get_font(segment['weight'], line['font_size'])
+                position = line['x'] + segment['x_offset'], line['y']
+
+                if not segment['is_keyword']:
+                    text_draw.text(position, segment['text'], 255, font)
+                    continue
+
+                # PIL draws the outline first, then the keyword over it.
+                if line['stroke_width']:
+                    outline_draw.text(position, segment['text'], 255, font, stroke_width=line['stroke_width'])
+                keyword_draw.text(position, segment['text'], 255, font)
+
+        return tuple(np.array(mask) for mask in masks)
 
 
-    def __write_text_without_keyword(self, word:str, image_pil:object, text_color:str, pos:tuple):
-        """ Write some text when there is no keyword. 
+    def __get_font(self, extension:str, font_size:int):
+        """ Get the used font from the shared font cache.
+
+            Attributes :
+                extension -> str : weight of the font ('regular', 'light' or 'bold').
+                font_size -> int : size of the font.
+        """
+        return FONT_CACHE.get_font(self.USED_FONT, extension, font_size)
+
+
+    def __estimate_font_size(self, texts:list):
+        """ Estimate the fitting font size in closed form from the fonts metrics.
+            Return None when a character is not in the metrics.
+
+            Attributes :
+                texts -> list : list of 2-tuple (text, font weight) written on the same line.
+        """
+        width_per_size = 0
+        for text, extension in texts:
+            width = get_font_metrics(FONT_CACHE.get_font_path(self.USED_FONT, extension)).get_width(text, 1)
+            if width == None:
+                return None
+            width_per_size += width
+
+        if width_per_size == 0:
+            return None
+        return math.ceil((self.output_image.shape[1] - self.MARGIN) / width_per_size)
+
+
+    def __fit_font_size(self, measure_width, estimated_size:int = None, start_size:int = None):
+        """ Find the font size that makes the text fill the width of the image.
+            Return the smallest size from 'start_size' whose width is not below the limit.
+            The search goes from the estimated size by growing steps, then bisects,
+            so a good estimate only needs a couple of measures.
+
+            Attributes :
+                measure_width -> function : give the width of the text for a font size.
+                estimated_size -> int : size from which to start the search.
+                start_size -> int : smallest font size allowed, 'MIN_FONT_SIZE' by default.
+        """
+        start_size = self.MIN_FONT_SIZE if start_size == None else start_size
+        max_width = self.output_image.shape[1] - self.MARGIN
+
+        # Each measure is counted in the trace of the template, to follow how good the estimates are.
+        def count_and_measure(size:int):
+            TRACER.count("text.font_size_measures")
+            return measure_width(size)
+
+        size = start_size if estimated_size == None else max(start_size, estimated_size)
+
+        if count_and_measure(size) >= max_width:
+            # Go down until a size is too small.
+            high, step = size, 1
+            while True:
+                if high == start_size:
+                    return start_size
+
+                low = max(start_size, high - step)
+                if count_and_measure(low) < max_width:
+                    break
+                high, step = low, step * 2
+        else:
+            # Go up until a size is wide enough.
+            low, step = size, 1
+            while True:
+                high = low + step
+                if count_and_measure(high) >= max_width:
+                    break
+                low, step = high, step * 2
+
+        # Narrow down between a too small size and a wide enough one.
+        while high - low > 1:
+            middle = (low + high) // 2
+            if count_and_measure(middle) < max_width:
+                low = middle
+            else:
+                high = middle
+
+        return high
+
+
+    def __layout_text_without_keyword(self, word:str, pos:tuple):
+        """ Place some text when there is no keyword. 
         
             Attributes :
                 word -> str : the word to write.
-                image_pil -> object : PIL image.
-                text_color -> str : color of the text.
                 pos -> tuple : 2-tuple where to write the text.
         """
-        font_size = 50
-        text_width, text_height = 0, 0
-
         # Choose the extension : regular or light.
         extensions = ["regular", "light"]
         font_index = random.randint(0, 1) if self.output_data == None else self.output_data['list_fonts_index'][self.current_word_index]
         self.CURRENT_LIST_FONTS_INDEX.append(font_index)
         extension = extensions[font_index]
 
-        while text_width < self.output_image.shape[1] - 20:
-            font = ImageFont.truetype(f"./fonts/{self.USED_FONT}/{self.USED_FONT}-{extension}.ttf", font_size)
-            text_width, text_height = font.getsize(word)
-            font_size += 1
+        estimated_size = self.__estimate_font_size([(word, extension)])
+        font_size = self.__fit_font_size(lambda size: self.__get_font(extension, size).getsize(word)[0], estimated_size)
+
+        text_width, text_height = self.__get_font(extension, font_size).getsize(word)
 
         x, y = pos
         if self.type_writing:
             x, y = x, self.output_image.shape[0] - text_height
 
-        # Handle the problem with padding on custom font.
-        font_top_padding = font_size / self.FONT_PADDING_TOP_RATIO
-
-        # Insert the text and transform it ingo a OpenCV image again. 
-        draw = ImageDraw.Draw(image_pil)
-        draw.text((x, y), word, text_color, font)
-        image = np.array(image_pil)
+        # Handle the problem with padding on custom font, with the size following the fitting one as the old growth loop left it.
+        font_top_padding = (font_size + 1) / self.FONT_PADDING_TOP_RATIO
 
-        return image, x, y + font_top_padding, text_width, text_height
+        return {
+            "x": x,
+            "y": y,
+            "font_size": font_size,
+            "stroke_width": 0,
+            "segments": [{"text": word, "weight": extension, "x_offset": 0, "is_keyword": False}],
+            "box": (x, y + font_top_padding, text_width, text_height)
+        }
 
 
-    def __write_text_with_keyword(self, word:str, keyword:str, image_pil:object, text_color:str, pos:tuple):
-        """ Write some text when there is some keyword. 
+    def __layout_text_with_keyword(self, word:str, keyword:str, pos:tuple):
+        """ Place some text when there is some keyword. 
         
             Attributes :
                 word -> str : the word to write.
                 keyword -> str : the keyword to write differently.
-                image_pil -> object : PIL image.
-                text_color -> str : color of the text.
                 pos -> tuple : 2-tuple where to write the text.
         """
-        font_size = 50
-        text_width_1, text_height_1 = 0, 0
-        text_width_2, text_height_2 = 0, 0
-        keyword_width, keyword_height = 0, 0
-
         parts = word.split(keyword)
 
         # Choose the extension : regular or light.
@@ -144,32 +295,40 @@ class TextCreator:
         self.CURRENT_LIST_FONTS_INDEX.append(font_index)
         extension = extensions[font_index]
 
-        while text_width_1 + keyword_width + text_width_2 < self.output_image.shape[1] - 20:
-            font = ImageFont.truetype(f"./fonts/{self.USED_FONT}/{self.USED_FONT}-{extension}.ttf", font_size)
-            keyword_font = ImageFont.truetype(f"./fonts/{self.USED_FONT}/{self.USED_FONT}-bold.ttf", font_size)
+        def measure_width(size:int):
+            font = self.__get_font(extension, size)
+            keyword_font = self.__get_font("bold", size)
+            return font.getsize(parts[0])[0] + keyword_font.getsize(keyword)[0] + font.getsize(parts[1])[0]
 
-            text_width_1, text_height_1 = font.getsize(parts[0])
-            text_width_2, text_height_2 = font.getsize(parts[1])
-            keyword_width, keyword_height = keyword_font.getsize(keyword)
+        estimated_size = self.__estimate_font_size([(parts[0], extension), (keyword, "bold"), (parts[1], extension)])
+        font_size = self.__fit_font_size(measure_width, estimated_size)
 
-            full_width, full_height = text_width_1 + keyword_width + text_width_2, max(text_height_1, text_height_2, keyword_height)
+        font = self.__get_font(extension, font_size)
+        keyword_font = self.__get_font("bold", font_size)
 
-            font_size += 1
+        text_width_1, text_height_1 = font.getsize(parts[0])
+        text_width_2, text_height_2 = font.getsize(parts[1])
+        keyword_width, keyword_height = keyword_font.getsize(keyword)
+
+        full_width, full_height = text_width_1 + keyword_width + text_width_2, max(text_height_1, text_height_2, keyword_height)
 
         # Handle the positionning of the last words.
         x, y = pos
         if self.type_writing:
-            x, y = x, self.output_image.shape[0] - full_height - 20 # 20 for padding.
-
-        # Handle the problem with padding on custom font.
-        font_top_padding = font_size / self.FONT_PADDING_TOP_RATIO
-
-        # Insert the text and transform it ingo a OpenCV image again. 
-        stroke_width = font_size // 70
-        draw = ImageDraw.Draw(image_pil)
-        draw.text((x, y), parts[0], text_color, font)
-        draw.text((x + text_width_1, y), keyword, self.keyword_font_color, keyword_font, stroke_fill=text_color, stroke_width=stroke_width)
-        draw.text((x + text_width_1 + keyword_width, y), parts[1], text_color, font)
-        image = np.array(image_pil)
-
-        return image, x, y + font_top_padding, full_width, full_height
\ No newline at end of file
+            x, y = x, self.output_image.shape[0] - full_height - self.MARGIN # Padding.
+
+        # Handle the problem with padding on custom font, with the size following the fitting one as the old growth loop left it.
+        font_top_padding = (font_size + 1) / self.FONT_PADDING_TOP_RATIO
+
+        return {
+            "x": x,
+            "y": y,
+            "font_size": font_size,
+            "stroke_width": (font_size + 1) // 70,
+            "segments": [
+                {"text": parts[0], "weight": extension, "x_offset": 0, "is_keyword": False},
+                {"text": keyword, "weight": "bold", "x_offset": text_width_1, "is_keyword": True},
+                {"text": parts[1], "weight": extension, "x_offset": text_width_1 + keyword_width, "is_keyword": False}
+            ],
+            "box": (x, y + font_top_padding, full_width, full_height)
+        }
@@ -0,0 +1,263 @@
+from contextlib import contextmanager, nullcontext
+import cProfile
+import json
+import os
+import os.path
+import threading
+import time
+
+class Tracer:
+    """ Used to time the stages of each template and save them as a trace, one record by template.
+        When it is off, every stage is the same empty context, so the instrumented code is almost not slowed down.
+        The stages and counters can also be recorded by other threads (ex: the image writer) while the template is open.
+    """
+
+    FORMATS = ["jsonl", "chrome"]
+
+    def __init__(self, trace_path:str = None, trace_format:str = "jsonl", profile_folder:str = None):
+        """ Attributes :
+                trace_path -> str : file where the templates are appended, None to not trace.
+                trace_format -> str : 'jsonl' (one JSON record by template) or 'chrome' (trace events for chrome://tracing or Perfetto).
+                profile_folder -> str : folder where a cProfile capture of each template is saved, None to not profile.
+        """
+        if trace_format not in self.FORMATS:
+            raise Exception(f"The trace format '{trace_format}' doesn't exist (available : {self.FORMATS}).")
+
+        self.trace_path = trace_path
+        self.trace_format = trace_format
+        self.profile_folder = profile_folder
+        self.enabled = trace_path != None or profile_folder != None
+
+        self.__template = None
+        self.__null_context = nullcontext()
+        self.__lock = threading.Lock()
+
+
+    def template(self, name:str, get_counters = None):
+        """ Trace a whole template, its stages are recorded until the end of the context.
+
+            Attributes :
+                name -> str : name of the template.
+                get_counters -> function : function returning a dict of counters (ex: cache hits), only their change during the template is saved.
+        """
+        if not self.enabled or self.__template != None:
+            return self.__null_context
+        return self.__trace_template(name, get_counters)
+
+
+    def stage(self, name:str):
+        """ Time a stage of the current template.
+
+            Attributes :
+                name -> str : name of the stage.
+        """
+        if self.__template == None:
+            return self.__null_context
+        return self.__trace_stage(name)
+
+
+    def count(self, name:str, amount:int = 1):
+        """ Add to a counter of the current template.
+
+            Attributes :
+                name -> str : name of the counter.
+                amount -> int : value to add.
+        """
+        template = self.__template
+        if template != None:
+            with self.__lock:
+                template["counts"][name] = template["counts"].get(name, 0) + amount
+
+
+    @contextmanager
+    def __trace_template(self, name:str, get_counters):
+        """ Record a template, and profile it if asked. """
+        counters_before = get_counters() if get_counters != None else {}
+        self.__template = {"name": name, "pid": os.getpid(), "start": time.perf_counter(), "stages": [], "counts": {}}
+
+        profiler = None
+        if self.profile_folder != None:
+            profiler = cProfile.Profile()
+            profiler.enable()
+
+        try:
+            yield
+        finally:
+            if profiler != None:
+                profiler.disable()
+                os.makedirs(self.profile_folder, exist_ok=True)
+                profiler.dump_stats(os.path.join(self.profile_folder, f"{name}.prof"))
+
+            template, self.__template = self.__template, None
+            template["duration"] = time.perf_counter() - template["start"]
+
+            if get_counters != None:
+                for key, value in get_counters().items():
+                    template["counts"][key] = template["counts"].get(key, 0) + value - counters_before.get(key, 0)
+
+            if self.trace_path != None:
+                self.__write(template)
+
+
+    @contextmanager
+    def __trace_stage(self, name:str):
+        """ Record the start, the duration and the thread of a stage (0 for the main thread). """
+        template = self.__template
+        thread_id = 0 if threading.current_thread() is threading.main_thread() else threading.get_native_id()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            template["stages"].append((name, start, time.perf_counter() - start, thread_id))
+
+
+    def __write(self, template:dict):
+        """ Append a template to the trace file, in one write so many processes can share the file.
+
+            Attributes :
+                template -> dict : recorded template.
+        """
+        if self.trace_format == "jsonl":
+            stages = {}
+            for name, _, duration, _ in template["stages"]:
+                stage = stages.setdefault(name, {"seconds": 0.0, "calls": 0})
+                stage["seconds"] += duration
+                stage["calls"] += 1
+
+            record = {"template": template["name"], "pid": template["pid"], "seconds": template["duration"], "stages": stages, "counts": template["counts"]}
+            text = json.dumps(record) + "\n"
+        else:
+            # Chrome JSON array format, the closing bracket is optional so the file can always be appended.
+            events = [self.__get_chrome_event(template["name"], template["name"], template["pid"], template["start"], template["duration"], template["counts"])]
+            events += [
+                self.__get_chrome_event(name, template["name"], template["pid"], start, duration, thread_id=thread_id)
+                for name, start, duration, thread_id in template["stages"]
+            ]
+            text = "".join(json.dumps(event) + ",\n" for event in events)
+
+            try:
+                with open(self.trace_path, "x") as trace_file:
+                    trace_file.write("[\n")
+            except FileExistsError:
+                pass
+
+        file_descriptor = os.open(self.trace_path, os.O_WRONLY | os.O_CREAT | os.O_APPEND)
+        try:
+            os.write(file_descriptor, text.encode("utf-8"))
+        finally:
+            os.close(file_descriptor)
+
+
+    def __get_chrome_event(self, name:str, template_name:str, pid:int, start:float, duration:float, counts:dict = None, thread_id:int = 0):
+        """ Get a complete event of the Chrome trace format, its times are in microseconds.
+            The stages of the other threads are on their own line, they overlap the ones of the main thread.
+        """
+        args = {"template": template_name}
+        if counts:
+            args.update(counts)
+        return {"name": name, "cat": "design", "ph": "X", "ts": int(start * 1e6), "dur": int(duration * 1e6), "pid": pid, "tid": thread_id, "args": args}
+
+
+
+def read_trace(trace_path:str):
+    """ Read a trace file (of any format) as a list of templates, each one with its seconds by stage and its counters.
+
+        Attributes :
+            trace_path -> str : path of the trace file.
+    """
+    with open(trace_path) as trace_file:
+        text = trace_file.read()
+
+    if not text.startswith("["):
+        templates = []
+        for line in text.splitlines():
+            if line.strip():
+                record = json.loads(line)
+                stages = {name: stage["seconds"] for name, stage in record["stages"].items()}
+                templates.append({"template": record["template"], "seconds": record["seconds"], "stages": stages, "counts": record["counts"]})
+        return templates
+
+    # Chrome format : the template event is followed by its stages.
+    events = json.loads(text.rstrip().rstrip(",") + "]")
+    templates = {}
+    for event in events:
+        key = event["pid"], event["args"]["template"]
+        if event["name"] == event["args"]["template"] and key not in templates:
+            counts = {name: value for name, value in event["args"].items() if name != "template"}
+            templates[key] = {"template": event["name"], "seconds": event["dur"] / 1e6, "stages": {}, "counts": counts}
+        elif key in templates:
+            stages = templates[key]["stages"]
+            stages[event["name"]] = stages.get(event["name"], 0.0) + event["dur"] / 1e6
+    return list(templates.values())
+
+
+def summarize_trace(trace_path:str):
+    """ Get the percentiles of the duration of each stage, and the total of each counter, over every template of a trace.
+
+        Attributes :
+            trace_path -> str : path of the trace file.
+    """
+    templates = read_trace(trace_path)
+
+    durations = {"template": [template["seconds"] for template in templates]}
+    counts = {}
+    for template in templates:
+        for name, seconds in template["stages"].items():
+            durations.setdefault(name, []).append(seconds)
+        for name, value in template["counts"].items():
+            counts[name] = counts.get(name, 0) + value
+
+    stages = {}
+    for name, values in durations.items():
+        values.sort()
+        stages[name] = {
+            "templates": len(values),
+            "total": sum(values),
+            "p50": get_percentile(values, 50),
+            "p90": get_percentile(values, 90),
+            "p99": get_percentile(values, 99),
+            "max": values[-1] if values else 0.0
+        }
+
+    return {"templates": len(templates), "stages": stages, "counts": counts}
+
+
+def get_percentile(sorted_values:list, percent:float):
+    """ Get a percentile of sorted values, interpolated between the two closest values.
+
+        Attributes :
+            sorted_values -> list : values sorted in ascending order.
+            percent -> float : percentile to get, between 0 and 100.
+    """
+    if not sorted_values:
+        return 0.0
+
+    position = (len(sorted_values) - 1) * percent / 100
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
+
+
+# Tracer of the process, configured by the environment so the worker processes trace like their parent.
+TRACER = Tracer(os.environ.get("DESIGN_TRACE"), os.environ.get("DESIGN_TRACE_FORMAT", "jsonl"), os.environ.get("DESIGN_PROFILE"))
+
+def configure_tracer(trace_path:str = None, trace_format:str = "jsonl", profile_folder:str = None):
+    """ Turn the tracing of the process and of its future worker processes on or off, a previous trace file is started again.
+
+        Attributes :
+            trace_path -> str : file where the templates are appended, None to not trace.
+            trace_format -> str : 'jsonl' or 'chrome'.
+            profile_folder -> str : folder where a cProfile capture of each template is saved, None to not profile.
+    """
+    TRACER.__init__(trace_path, trace_format, profile_folder)
+
+    for key, value in [("DESIGN_TRACE", trace_path), ("DESIGN_TRACE_FORMAT", trace_format), ("DESIGN_PROFILE", profile_folder)]:
+        if value == None:
+            os.environ.pop(key, None)
+        else:
+            os.environ[key] = value
+
+    if trace_path != None and os.path.isfile(trace_path):
+        os.remove(trace_path)
+
+    return TRACER
@@ -0,0 +1,55 @@
+import os
+
+import numpy as np
+
+import batch
+import design.design_handler
+from design.image_writer import IMAGE_WRITER
+
+
+class FakeHandler:
+    """ Hand over one write per color, the color 'broken' to a missing folder, and raise on the color 'raise'. """
+
+    FOLDER = None
+
+    def __init__(self, index, **kwargs):
+        self.index = index
+
+    def build_colorways(self, colors):
+        paths = []
+        for color in colors:
+            if color == "raise":
+                raise Exception("The build failed.")
+            folder = os.path.join(self.FOLDER, "missing") if color == "broken" else self.FOLDER
+            paths.append(os.path.join(folder, f"{self.index}-{color}.png"))
+            IMAGE_WRITER.write(paths[-1], np.zeros((8, 8, 4), dtype=np.uint8))
+        return paths
+
+
+def test_run_job_keeps_its_write_errors(tmp_path, monkeypatch):
+    FakeHandler.FOLDER = str(tmp_path)
+    monkeypatch.setattr(design.design_handler, "DesignHandler", FakeHandler)
+
+    failed = batch.run_job(1, 1, ["white", "broken"])
+    succeeded = batch.run_job(2, 1, ["white"])
+
+    assert failed["error"] != None
+    assert succeeded["error"] == None
+    assert os.path.isfile(tmp_path / "2-white.png")
+    assert set(succeeded["caches"]) == {"font_cache", "raster_cache"}
+
+
+def test_get_hit_rate():
+    assert batch.get_hit_rate({"hits": 3, "misses": 1}) == {"hits": 3, "misses": 1, "hit_rate": 0.75}
+    assert batch.get_hit_rate({"hits": 0, "misses": 0})["hit_rate"] == 0.0
+
+
+def test_run_job_waits_for_its_writes_when_it_fails(tmp_path, monkeypatch):
+    FakeHandler.FOLDER = str(tmp_path)
+    monkeypatch.setattr(design.design_handler, "DesignHandler", FakeHandler)
+
+    failed = batch.run_job(1, 1, ["broken", "raise"])
+    succeeded = batch.run_job(2, 1, ["white"])
+
+    assert failed["error"] == "The build failed."
+    assert succeeded["error"] == None
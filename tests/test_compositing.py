@@ -0,0 +1,48 @@
+import os
+
+import numpy as np
+import pytest
+from PIL import Image, ImageDraw, ImageFont
+
+from design.compositing import blend_color
+
+FONT_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "fonts", "roboto", "roboto-bold.ttf")
+
+
+def get_canvas(alpha:int):
+    """ Get a BGRA canvas of one color with the given alpha. """
+    canvas = np.empty((120, 360, 4), dtype=np.uint8)
+    canvas[:, :] = (200, 50, 10, alpha)
+    return canvas
+
+
+def get_mask(size:tuple, text:str, font:object, stroke_width:int = 0):
+    """ Get the coverage of a text drawn by PIL. """
+    mask = Image.new("L", size, 0)
+    ImageDraw.Draw(mask).text((10, 10), text, 255, font, stroke_width=stroke_width)
+    return np.asarray(mask)
+
+
+@pytest.mark.parametrize("alpha", [0, 128, 255])
+def test_blend_color_matches_pil_text(alpha):
+    font = ImageFont.truetype(FONT_PATH, 60)
+    ink, stroke = (30, 100, 240, 255), (0, 0, 0, 255)
+
+    expected = Image.fromarray(get_canvas(alpha))
+    ImageDraw.Draw(expected).text((10, 10), "Hello You", ink, font)
+    ImageDraw.Draw(expected).text((10, 10), "Keyword", ink, font, stroke_fill=stroke, stroke_width=3)
+
+    result = get_canvas(alpha)
+    size = result.shape[1], result.shape[0]
+    blend_color(result, ink, get_mask(size, "Hello You", font))
+    blend_color(result, stroke, get_mask(size, "Keyword", font, 3))
+    blend_color(result, ink, get_mask(size, "Keyword", font))
+
+    assert (np.asarray(expected) == result).all()
+
+
+def test_blend_color_without_coverage_keeps_image():
+    canvas = get_canvas(128)
+    blend_color(canvas, (1, 2, 3, 255), np.zeros(canvas.shape[:2], dtype=np.uint8))
+
+    assert (canvas == get_canvas(128)).all()
@@ -0,0 +1,21 @@
+import os
+import shutil
+
+import text.font_metrics
+from text.font_metrics import FontMetrics
+
+FONT_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "fonts", "roboto", "roboto-regular.ttf")
+
+
+def test_metrics_are_kept_when_the_index_cannot_be_saved(tmp_path, monkeypatch):
+    font_path = str(tmp_path / "roboto-regular.ttf")
+    shutil.copy(FONT_PATH, font_path)
+
+    def replace(source, destination):
+        raise PermissionError("Read-only file system.")
+    monkeypatch.setattr(text.font_metrics.os, "replace", replace)
+
+    metrics = FontMetrics(font_path)
+
+    assert metrics.get_width("Stay", 100) > 0
+    assert os.listdir(tmp_path) == ["roboto-regular.ttf"]
@@ -0,0 +1,45 @@
+import cv2
+import numpy as np
+import pytest
+
+from design.image_writer import ImageWriter, get_output_path, parse_compression
+
+
+def get_image():
+    """ Get a random BGRA image. """
+    return np.random.default_rng(0).integers(0, 256, (32, 48, 4), dtype=np.uint8)
+
+
+@pytest.mark.parametrize("extension, compression", [("png", "fast"), ("png", "best"), ("png", 0), ("webp", "best")])
+def test_write_keeps_pixels(tmp_path, extension, compression):
+    writer, image = ImageWriter(), get_image()
+    path = str(tmp_path / f"image.{extension}")
+
+    writer.write(path, image, compression)
+    writer.flush()
+
+    # Only the visible pixels are kept by lossless WebP, the color of the fully transparent ones may change.
+    written = cv2.imread(path, cv2.IMREAD_UNCHANGED)
+    is_visible = image[:, :, 3] != 0
+    assert (written[:, :, 3] == image[:, :, 3]).all()
+    assert (written[is_visible] == image[is_visible]).all()
+    assert [file.name for file in tmp_path.iterdir()] == [f"image.{extension}"]
+
+
+def test_write_rejects_unknown_compression(tmp_path):
+    with pytest.raises(Exception):
+        ImageWriter().write(str(tmp_path / "image.png"), get_image(), 10)
+
+
+def test_parse_compression():
+    assert parse_compression("fast") == "fast"
+    assert parse_compression("7") == 7
+    with pytest.raises(ValueError):
+        parse_compression("12")
+    with pytest.raises(ValueError):
+        parse_compression("smallest")
+
+
+def test_get_output_path_keeps_file_name_characters():
+    assert get_output_path("office-fan", 1, "white") == "./images/output/office-fan-1-white.png"
+    assert get_output_path("office-fan", 1, "#ff0000", "webp") == "./images/output/office-fan-1-ff0000.webp"
@@ -0,0 +1,126 @@
+import sqlite3
+
+from inout.job_queue import JobQueue
+
+
+def get_queue(tmp_path, max_attempts:int = 3):
+    """ Get an empty queue in a temporary database. """
+    return JobQueue(str(tmp_path / "jobs.sqlite"), max_attempts)
+
+
+def test_queue_uses_a_rollback_journal(tmp_path):
+    # A WAL database can't be shared by several machines, its index is in shared memory.
+    database_path = str(tmp_path / "jobs.sqlite")
+    connection = sqlite3.connect(database_path)
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.close()
+
+    get_queue(tmp_path)
+    connection = sqlite3.connect(database_path)
+    assert connection.execute("PRAGMA journal_mode").fetchone()[0] == "delete"
+    connection.close()
+
+
+def test_enqueue_ignores_known_jobs(tmp_path):
+    queue = get_queue(tmp_path)
+
+    assert queue.enqueue([(1, 1, ["white"]), (2, 0, None)]) == (2, 0)
+    assert queue.enqueue([(1, 1, ["white"]), (3, 0, None)]) == (1, 0)
+    assert queue.get_status()["counts"]["pending"] == 3
+
+
+def test_enqueue_requeues_done_jobs_with_the_new_scale(tmp_path):
+    queue = get_queue(tmp_path)
+    queue.enqueue([(1, 0, None), (2, 0, None)])
+    for _ in range(2):
+        job = queue.claim("worker")
+        queue.finish(job["id"], "worker", 1.0)
+
+    assert queue.enqueue([(1, 0, None), (2, 0, None)], 0.25) == (0, 0)
+    assert queue.enqueue([(1, 0, None), (2, 0, None)], 0.25, requeue=True) == (0, 2)
+
+    job = queue.claim("worker")
+    assert job["preview_scale"] == 0.25
+    assert job["attempt"] == 1
+
+
+def test_enqueue_never_requeues_running_jobs(tmp_path):
+    queue = get_queue(tmp_path)
+    queue.enqueue([(1, 0, None)])
+    job = queue.claim("worker")
+
+    assert queue.enqueue([(1, 0, None)], requeue=True) == (0, 0)
+    assert queue.finish(job["id"], "worker", 1.0)
+
+
+def test_claim_takes_jobs_in_order_once(tmp_path):
+    queue = get_queue(tmp_path)
+    queue.enqueue([(1, 1, ["white", "black"]), (2, 1, ["white"])])
+
+    first, second = queue.claim("a"), queue.claim("b")
+
+    assert (first["index"], first["colors"]) == (1, ["white", "black"])
+    assert second["index"] == 2
+    assert queue.claim("c") == None
+
+
+def test_expired_lease_is_claimed_again(tmp_path):
+    queue = get_queue(tmp_path)
+    queue.enqueue([(1, 0, None)])
+
+    # A negative lease is already expired, like a worker that died.
+    dead_job = queue.claim("dead", lease_seconds=-1)
+    job = queue.claim("alive")
+
+    assert job["id"] == dead_job["id"]
+    assert job["attempt"] == 2
+
+
+def test_stale_worker_can_not_renew_nor_finish(tmp_path):
+    queue = get_queue(tmp_path)
+    queue.enqueue([(1, 0, None)])
+    job = queue.claim("stale", lease_seconds=-1)
+    queue.claim("new")
+
+    assert not queue.renew(job["id"], "stale")
+    assert not queue.finish(job["id"], "stale", 1.0, "late error")
+    assert queue.renew(job["id"], "new")
+    assert queue.finish(job["id"], "new", 1.0)
+    assert queue.get_status()["counts"] == {"pending": 0, "running": 0, "done": 1, "failed": 0}
+
+
+def test_failed_job_is_retried_until_max_attempts(tmp_path):
+    queue = get_queue(tmp_path, max_attempts=2)
+    queue.enqueue([(1, 0, None)])
+
+    job = queue.claim("worker")
+    queue.finish(job["id"], "worker", 1.0, "first error")
+    assert queue.get_status()["counts"]["pending"] == 1
+
+    job = queue.claim("worker")
+    queue.finish(job["id"], "worker", 1.0, "second error")
+    status = queue.get_status()
+
+    assert queue.claim("worker") == None
+    assert status["counts"]["failed"] == 1
+    assert status["failed"][0]["error"] == "second error"
+    assert status["failed"][0]["attempts"] == 2
+
+
+def test_expired_lease_without_attempts_left_is_failed(tmp_path):
+    queue = get_queue(tmp_path, max_attempts=1)
+    queue.enqueue([(1, 0, None)])
+    queue.claim("dead", lease_seconds=-1)
+
+    assert queue.claim("worker") == None
+    assert queue.get_status()["failed"][0]["error"] == "The lease of the job expired."
+
+
+def test_retry_failed_gives_back_every_attempt(tmp_path):
+    queue = get_queue(tmp_path, max_attempts=1)
+    queue.enqueue([(1, 0, None)])
+    job = queue.claim("worker")
+    queue.finish(job["id"], "worker", 1.0, "error")
+
+    assert queue.retry_failed() == 1
+    assert queue.claim("worker")["attempt"] == 1
@@ -0,0 +1,74 @@
+import json
+import sqlite3
+
+from inout.output_store import SQLiteOutputStore
+
+
+def write_legacy_json(path, designs:list):
+    """ Write an old output JSON. """
+    with open(path, "w") as json_file:
+        json.dump(designs, json_file)
+
+
+def test_upsert_replaces_the_design(tmp_path):
+    store = SQLiteOutputStore(str(tmp_path / "output.sqlite"), None)
+    store.upsert({"index": 2, "font": "roboto"})
+    store.upsert({"index": 1, "font": "crimson"})
+    store.upsert({"index": 2, "font": "teen"})
+
+    assert store.get(2) == {"index": 2, "font": "teen"}
+    assert store.get(3) == None
+    assert [design["index"] for design in store.get_all()] == [1, 2]
+
+
+def test_one_connection_per_process(tmp_path, monkeypatch):
+    connections = []
+    connect = sqlite3.connect
+    monkeypatch.setattr(sqlite3, "connect", lambda *args, **kwargs: connections.append(args) or connect(*args, **kwargs))
+
+    store = SQLiteOutputStore(str(tmp_path / "output.sqlite"), None)
+    for index in range(5):
+        store.upsert({"index": index})
+        store.get(index)
+    store.get_all()
+
+    assert len(connections) == 1
+
+
+def test_store_uses_a_rollback_journal(tmp_path):
+    database_path = str(tmp_path / "output.sqlite")
+    connection = sqlite3.connect(database_path)
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.close()
+
+    SQLiteOutputStore(database_path, None)
+    connection = sqlite3.connect(database_path)
+    assert connection.execute("PRAGMA journal_mode").fetchone()[0] == "delete"
+    connection.close()
+
+
+def test_legacy_json_is_imported_once(tmp_path, capsys):
+    legacy_path = tmp_path / "output.json"
+    write_legacy_json(legacy_path, [{"index": 1, "font": "roboto"}])
+
+    store = SQLiteOutputStore(str(tmp_path / "output.sqlite"), str(legacy_path))
+    store.upsert({"index": 1, "font": "teen"})
+    assert "isn't read anymore" in capsys.readouterr().out
+
+    # The JSON is never imported again, and the message isn't repeated while it doesn't change.
+    store = SQLiteOutputStore(str(tmp_path / "output.sqlite"), str(legacy_path))
+    assert store.get(1)["font"] == "teen"
+    assert capsys.readouterr().out == ""
+
+
+def test_changed_legacy_json_is_reported(tmp_path, capsys):
+    legacy_path = tmp_path / "output.json"
+    write_legacy_json(legacy_path, [{"index": 1, "font": "roboto"}])
+    SQLiteOutputStore(str(tmp_path / "output.sqlite"), str(legacy_path))
+    capsys.readouterr()
+
+    write_legacy_json(legacy_path, [{"index": 1, "font": "roboto"}, {"index": 2, "font": "teen"}])
+    store = SQLiteOutputStore(str(tmp_path / "output.sqlite"), str(legacy_path))
+
+    assert "changed but it isn't read anymore" in capsys.readouterr().out
+    assert store.get(2) == None
@@ -0,0 +1,83 @@
+import random
+
+import pytest
+
+from design.place_finder import PlaceFinder
+
+# Random layouts of the fuzz : (seed, design size, image size, text boxes).
+LAYOUTS = []
+for seed in range(150):
+    generator = random.Random(seed)
+    design_size = generator.randint(40, 160), generator.randint(40, 160)
+    image_size = generator.randint(10, 300), generator.randint(10, 300)
+    text_positions = [
+        (generator.uniform(-10, design_size[0]), generator.uniform(-10, design_size[1]), generator.uniform(1, 60), generator.uniform(1, 30))
+        for _ in range(generator.randint(0, 6))
+    ]
+    LAYOUTS.append((design_size, image_size, text_positions))
+
+
+def find_place(layout:tuple, method:str, has_to_be_centered:bool = False):
+    """ Find the place of the image of a layout with a method. """
+    design_size, image_size, text_positions = layout
+    return PlaceFinder(text_positions, design_size, image_size, has_to_be_centered, reduce_ratio=10, method=method).find_best_place()
+
+
+def is_free(place:tuple, layout:tuple):
+    """ See if a place is in the design and covers no text box. """
+    (design_width, design_height), _, text_positions = layout
+    x, y, w, h = place
+    if x < 0 or y < 0 or x + w > design_width or y + h > design_height:
+        return False
+
+    return all(
+        x + w <= text_x or x >= text_x + text_width or y + h <= text_y or y >= text_y + text_height
+        for text_x, text_y, text_width, text_height in text_positions
+    )
+
+
+def get_area(place):
+    """ Get the area of a place, 0 when there is none. """
+    return 0 if place == False else place[2] * place[3]
+
+
+@pytest.mark.parametrize("method", PlaceFinder.METHODS)
+def test_place_covers_no_text(method):
+    for layout in LAYOUTS:
+        place = find_place(layout, method)
+        assert place == False or is_free(place, layout), (layout, place)
+
+
+def test_centered_exact_place_covers_no_text():
+    for layout in LAYOUTS:
+        place = find_place(layout, "exact", has_to_be_centered=True)
+        if place != False:
+            assert is_free(place, layout), (layout, place)
+            assert place[0] == (layout[0][0] - place[2]) // 2
+
+
+@pytest.mark.parametrize("method", ["integral", "exact"])
+def test_place_is_at_least_as_large_as_grid(method):
+    for layout in LAYOUTS:
+        assert get_area(find_place(layout, method)) >= get_area(find_place(layout, "grid")), layout
+
+
+def test_place_keeps_image_ratio():
+    for layout in LAYOUTS:
+        place = find_place(layout, "exact")
+        if place != False and min(place[2:]) > 10:
+            image_width, image_height = layout[1]
+            assert place[2] / place[3] == pytest.approx(image_width / image_height, rel=0.2)
+
+
+def test_unknown_method_is_refused():
+    with pytest.raises(Exception):
+        PlaceFinder([], (10, 10), (5, 5), method="random")
+
+
+def test_integral_place_does_not_depend_on_blocks(monkeypatch):
+    places = [find_place(layout, "integral") for layout in LAYOUTS]
+
+    # Blocks smaller than the designs, so the sums and the positions are computed in many blocks.
+    monkeypatch.setattr(PlaceFinder, "BLOCK_SIZE", 7)
+    assert [find_place(layout, "integral") for layout in LAYOUTS] == places
@@ -0,0 +1,58 @@
+import os
+
+import numpy as np
+
+import design.raster_cache
+from design.raster_cache import RasterCache
+
+# Size of a saved raster of get_raster (its data and the NumPy header).
+RASTER_BYTES = 10000 + 128
+
+
+def get_raster(value:int):
+    """ Get a raster of 10000 bytes. """
+    return np.full((50, 50, 4), value, dtype=np.uint8)
+
+
+def get_cache(tmp_path, number_of_rasters:int):
+    """ Get an empty cache holding a number of rasters. """
+    return RasterCache(str(tmp_path) + "/", number_of_rasters * RASTER_BYTES)
+
+
+def test_get_returns_the_saved_raster(tmp_path):
+    cache = get_cache(tmp_path, 4)
+    cache.put("a", get_raster(1))
+
+    assert (cache.get("a") == get_raster(1)).all()
+    assert cache.get("b") == None
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_cache_stays_in_its_size_and_keeps_recent_rasters(tmp_path):
+    cache = get_cache(tmp_path, 5)
+    for index in range(5):
+        cache.put(str(index), get_raster(index))
+    cache.get("0")
+
+    cache.put("5", get_raster(5))
+
+    kept = sorted(filename[:-4] for filename in os.listdir(tmp_path))
+    assert sum(os.path.getsize(tmp_path / filename) for filename in os.listdir(tmp_path)) <= 5 * RASTER_BYTES
+    # Evicted down to 80% of the size : the two least recently used rasters are removed.
+    assert kept == ["0", "3", "4", "5"]
+
+
+def test_folder_is_only_listed_when_the_cache_is_full(tmp_path, monkeypatch):
+    listings = []
+    listdir = os.listdir
+    monkeypatch.setattr(design.raster_cache.os, "listdir", lambda path: listings.append(path) or listdir(path))
+
+    cache = get_cache(tmp_path, 10)
+    for index in range(10):
+        cache.put(str(index), get_raster(index))
+    assert len(listings) == 1
+
+    # A full cache is brought down to a share of its size, so the next rasters fit without listing it.
+    cache.put("10", get_raster(10))
+    cache.put("11", get_raster(11))
+    assert len(listings) == 2
@@ -0,0 +1,72 @@
+from functools import lru_cache
+import os
+
+import numpy as np
+import pytest
+from PIL import ImageFont
+
+from text.text_creator import TextCreator
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FAMILIES = ["crimson", "merriweather", "raleway", "roboto", "teen"]
+WORDS = ["Stay", "Working from home", "The best office fan ever"]
+
+
+@lru_cache(maxsize=None)
+def get_font(family:str, weight:str, size:int):
+    """ Load a bundled font, apart from the font cache of the project. """
+    return ImageFont.truetype(os.path.join(ROOT, "fonts", family, f"{family}-{weight}.ttf"), size)
+
+
+def scan_font_size(measure_width, max_width:int, start_size:int):
+    """ Find the fitting font size like the old growth loop, one size at a time. """
+    font_size = start_size
+    while measure_width(font_size) < max_width:
+        font_size += 1
+    return font_size
+
+
+def get_text_creator(family:str, width:int, words:list = WORDS, keywords:tuple = (), scale:float = 1):
+    """ Get a TextCreator writing on a blank image with the regular weight. """
+    output_data = {"font": family, "list_fonts_index": [0] * len(words)}
+    return TextCreator(words, keywords, np.zeros((900, width, 4), dtype=np.uint8), "white", (0, 0, 0), output_data, scale)
+
+
+@pytest.mark.parametrize("family", FAMILIES)
+@pytest.mark.parametrize("width", [60, 500])
+def test_fit_font_size_matches_linear_scan(monkeypatch, family, width):
+    monkeypatch.chdir(ROOT)
+    text_creator = get_text_creator(family, width)
+    max_width = width - text_creator.MARGIN
+
+    for weight in ["regular", "light", "bold"]:
+        for word in WORDS:
+            measure_width = lambda size: get_font(family, weight, size).getsize(word)[0]
+            expected = scan_font_size(measure_width, max_width, text_creator.MIN_FONT_SIZE)
+
+            assert text_creator._TextCreator__fit_font_size(measure_width) == expected
+            # A wrong estimate only costs measures, never another size.
+            for estimated_size in [1, expected - 7, expected, expected + 13, 4 * expected]:
+                assert text_creator._TextCreator__fit_font_size(measure_width, estimated_size) == expected
+
+
+@pytest.mark.parametrize("family", FAMILIES)
+def test_layout_text_matches_linear_scan(monkeypatch, family):
+    monkeypatch.chdir(ROOT)
+    words = ["Stay", "Positive", "Working from home", "The best office fan"]
+    text_creator = get_text_creator(family, 1000, words, ["office"])
+    max_width = 1000 - text_creator.MARGIN
+
+    lines = text_creator.layout_text(type_writing=False)
+
+    for word, line in zip(words, lines):
+        if "office" in word:
+            parts = word.split("office")
+            measure_width = lambda size: (get_font(family, "regular", size).getsize(parts[0])[0] + get_font(family, "bold", size).getsize("office")[0]
+                                          + get_font(family, "regular", size).getsize(parts[1])[0])
+        else:
+            measure_width = lambda size: get_font(family, "regular", size).getsize(word)[0]
+
+        font_size = scan_font_size(measure_width, max_width, text_creator.MIN_FONT_SIZE)
+        assert line["font_size"] == font_size
+        assert line["box"][2] == measure_width(font_size)
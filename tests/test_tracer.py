@@ -0,0 +1,69 @@
+import threading
+
+import numpy as np
+import pytest
+
+import design.image_writer
+from design.image_writer import ImageWriter
+from tracer import Tracer, read_trace, summarize_trace
+
+
+@pytest.mark.parametrize("trace_format", Tracer.FORMATS)
+def test_trace_keeps_stages_and_counters(tmp_path, trace_format):
+    trace_path = str(tmp_path / "trace")
+    tracer = Tracer(trace_path, trace_format)
+    cache = {"hits": 0}
+
+    for name in ["first", "second"]:
+        with tracer.template(name, lambda: dict(cache)):
+            with tracer.stage("text"):
+                tracer.count("measures", 3)
+            cache["hits"] += 2
+    tracer.count("measures")
+
+    templates = read_trace(trace_path)
+    assert [template["template"] for template in templates] == ["first", "second"]
+    assert templates[0]["counts"] == {"measures": 3, "hits": 2}
+    assert list(templates[0]["stages"]) == ["text"]
+    assert summarize_trace(trace_path)["counts"] == {"measures": 6, "hits": 4}
+
+
+def test_disabled_tracer_counts_nothing():
+    tracer = Tracer()
+    with tracer.template("template"):
+        with tracer.stage("text"):
+            tracer.count("measures")
+
+    assert not tracer.enabled
+
+
+def test_image_writer_counts_its_waits(tmp_path, monkeypatch):
+    trace_path = str(tmp_path / "trace")
+    tracer = Tracer(trace_path)
+    monkeypatch.setattr(design.image_writer, "TRACER", tracer)
+
+    # Every write is held until the release, so the second one waits for the slot of the first one.
+    is_released = threading.Event()
+    monkeypatch.setattr(ImageWriter, "_ImageWriter__write", lambda self, path, image, parameters: is_released.wait())
+    writer, image = ImageWriter(max_workers=1, max_pending=1), np.zeros((8, 8, 4), dtype=np.uint8)
+
+    with tracer.template("template"):
+        writer.write(str(tmp_path / "first.png"), image)
+        threading.Timer(0.2, is_released.set).start()
+        writer.write(str(tmp_path / "second.png"), image)
+        writer.flush()
+
+    assert read_trace(trace_path)[0]["counts"] == {"image_writer.waits": 1}
+
+
+def test_image_writer_stages_are_in_the_template(tmp_path, monkeypatch):
+    trace_path = str(tmp_path / "trace.json")
+    tracer = Tracer(trace_path, "chrome")
+    monkeypatch.setattr(design.image_writer, "TRACER", tracer)
+    writer = ImageWriter()
+
+    with tracer.template("template"):
+        writer.write(str(tmp_path / "image.png"), np.zeros((64, 64, 4), dtype=np.uint8))
+        writer.flush()
+
+    assert set(read_trace(trace_path)[0]["stages"]) == {"image/encode", "image/write_file"}